@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmarks.synthetic_match_library import SyntheticMatchGenerator, synthetic_champion_names, write_empty_data_files
+from src.arena_pipeline import ArenaPipeline
+from src.champ_placement_writer_factory import champ_placement_writer_factory
+from src.league_library import Match
+from src.pairwise_analysis_library import PairwiseChampionData
+from src.riot_api_stub_server import RiotApiStubServer
+
+
+def timed(function, *args, **kwargs) -> tuple[float, object]:
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start_time, result
+
+
+def traced_peak_bytes(function, *args, **kwargs) -> tuple[float, int, object]:
+    tracemalloc.start()
+    try:
+        elapsed_seconds, result = timed(function, *args, **kwargs)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed_seconds, peak_bytes, result
+
+
+def ingest(number_of_teams: int, placements_file_name: str, recorded_games_file_name: str,
+           generator: SyntheticMatchGenerator, number_of_matches: int, chunk_size: int = 1_000,
+           trace_memory: bool = False) -> tuple[float, dict[str, int]]:
+    # Matches are generated in chunks outside the timed section, so only parsing and saving are measured.
+    # With `trace_memory` the peaks are traced too, which slows everything down, so that run's time is not comparable.
+    # The ingest peak leaves out the generated chunk, and the snapshot peak is what the final snapshot adds.
+    elapsed_seconds = 0.0
+    peak_memory_bytes = {"ingest": 0, "snapshot": 0}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        writer = champ_placement_writer_factory(number_of_teams, placements_file_name, recorded_games_file_name)
+        writer.configure_flushing(flush_every_number_of_matches=1_000)
+        if trace_memory:
+            writer.snapshot_every_number_of_matches = number_of_matches + 1  # Only the final snapshot, on its own.
+        for start in range(0, number_of_matches, chunk_size):
+            traced_bytes_before_chunk = tracemalloc.get_traced_memory()[0]
+            match_details = list(generator.match_details(min(chunk_size, number_of_matches - start), start))
+            traced_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start_time = time.perf_counter()
+            for match_detail in match_details:
+                writer.save(Match.from_game_data(match_detail))
+            elapsed_seconds += time.perf_counter() - start_time
+            peak_bytes = tracemalloc.get_traced_memory()[1] - (traced_bytes - traced_bytes_before_chunk)
+            peak_memory_bytes["ingest"] = max(peak_memory_bytes["ingest"], peak_bytes)
+
+        traced_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start_time = time.perf_counter()
+        writer.close()
+        elapsed_seconds += time.perf_counter() - start_time
+        peak_memory_bytes["snapshot"] = tracemalloc.get_traced_memory()[1] - traced_bytes
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return elapsed_seconds, peak_memory_bytes if trace_memory else {}
+
+
+def directory_size_bytes(dir_path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(dir_path) if entry.is_file())
+
+
+def load_placement_counts(number_of_teams: int, placements_file_name: str, recorded_games_file_name: str):
+    writer = champ_placement_writer_factory(number_of_teams, placements_file_name, recorded_games_file_name)
+    return writer.placement_counts
+
+
+def benchmark_storage_and_stats(number_of_teams: int, number_of_matches: int, number_of_champions: int,
+                                seed: int) -> dict:
+    results = {"number_of_teams": number_of_teams, "number_of_matches": number_of_matches,
+               "number_of_champions": number_of_champions}
+    champion_names = synthetic_champion_names(number_of_champions)
+    generator = SyntheticMatchGenerator(number_of_teams, champion_names, seed=seed)
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        previous_working_dir_path = os.getcwd()
+        os.chdir(dir_path)
+        try:
+            placements_file_name, recorded_games_file_name = write_empty_data_files(dir_path, champion_names, number_of_teams)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed_seconds, _ = ingest(number_of_teams, placements_file_name, recorded_games_file_name, generator,
+                                            number_of_matches)
+            results["ingest_seconds"] = elapsed_seconds
+            results["ingest_matches_per_second"] = number_of_matches / elapsed_seconds
+            results["data_files_bytes"] = directory_size_bytes(dir_path)
+
+            # The same matches again into an empty copy, traced for memory.
+            traced_dir_path = os.path.join(dir_path, "traced")
+            os.mkdir(traced_dir_path)
+            os.chdir(traced_dir_path)
+            write_empty_data_files(traced_dir_path, champion_names, number_of_teams)
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, peak_memory_bytes = ingest(number_of_teams, placements_file_name, recorded_games_file_name,
+                                              SyntheticMatchGenerator(number_of_teams, champion_names, seed=seed),
+                                              number_of_matches, trace_memory=True)
+            os.chdir(dir_path)
+            results["ingest_peak_memory_bytes"] = peak_memory_bytes["ingest"]
+            results["snapshot_write_peak_memory_bytes"] = peak_memory_bytes["snapshot"]
+
+            results["load_snapshot_seconds"], placement_counts = timed(load_placement_counts, number_of_teams,
+                                                                       placements_file_name, recorded_games_file_name)
+            _, peak_bytes, _ = traced_peak_bytes(load_placement_counts, number_of_teams, placements_file_name,
+                                                 recorded_games_file_name)
+            results["load_snapshot_peak_memory_bytes"] = peak_bytes
+            results["placement_counts_bytes"] = placement_counts.nbytes
+
+            for file_name in os.listdir(dir_path):
+                if "_snapshot" in file_name:
+                    os.remove(file_name)
+            results["load_csv_and_log_seconds"], _ = timed(load_placement_counts, number_of_teams,
+                                                           placements_file_name, recorded_games_file_name)
+            for file_name in os.listdir(dir_path):
+                if "_snapshot" in file_name:
+                    os.remove(file_name)
+            _, peak_bytes, _ = traced_peak_bytes(load_placement_counts, number_of_teams, placements_file_name,
+                                                 recorded_games_file_name)
+            results["load_csv_and_log_peak_memory_bytes"] = peak_bytes
+
+            pairwise_data = PairwiseChampionData.from_tensor(champion_names, placement_counts.copy(), number_of_teams)
+            results["best_champs_seconds"], _ = timed(pairwise_data.best_champs, 30)
+            results["best_pairs_seconds"], _ = timed(pairwise_data.best_pairs, 100)
+            results["adjusted_best_pairs_seconds"], _ = timed(pairwise_data.adjusted_best_pairs, 100)
+
+            arena_pipeline = ArenaPipeline(number_of_teams, placements_file_name, recorded_games_file_name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                results["confusion_matrix_seconds"], _ = timed(arena_pipeline.plot_champion_confusion_matrix, 20, dir_path)
+        finally:
+            os.chdir(previous_working_dir_path)
+    return results
+
+
+def benchmark_crawl(number_of_teams: int, number_of_matches: int, number_of_champions: int, seed: int,
+                    thread_limit: int, latency_seconds: float) -> dict:
+    champion_names = synthetic_champion_names(number_of_champions)
+    generator = SyntheticMatchGenerator(number_of_teams, champion_names, number_of_players=number_of_matches,
+                                        seed=seed, non_arena_fraction=0.3)
+    match_details = list(generator.match_details(number_of_matches))
+    seed_puuid = match_details[0]["metadata"]["participants"][0]
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        previous_working_dir_path = os.getcwd()
+        os.chdir(dir_path)
+        try:
+            placements_file_name, recorded_games_file_name = write_empty_data_files(dir_path, champion_names, number_of_teams)
+            with RiotApiStubServer(match_details, {("benchmark", "euw"): seed_puuid}, latency_seconds=latency_seconds,
+                                   app_rate_limits="100000:1") as server:
+                arena_pipeline = ArenaPipeline(number_of_teams, placements_file_name, recorded_games_file_name)
+                arena_pipeline.register_config({"RIOT_DEV_KEY": "benchmark", "MY_SUMMONER_NAME": "benchmark",
+                                                "MY_TAGLINE": "euw", "RIOT_API_BASE_URL": server.base_url,
+                                                "RIOT_APP_RATE_LIMITS": "100000:1"})
+                target_number_of_matches = number_of_matches // 2
+                with contextlib.redirect_stdout(io.StringIO()):
+                    try:
+                        elapsed_seconds, _ = timed(arena_pipeline.save_matches_recursive,
+                                                   target_number_of_matches=target_number_of_matches,
+                                                   thread_limit=thread_limit, verbose=False)
+                    except SystemExit:
+                        elapsed_seconds = float("nan")  # The synthetic player graph ran out before the target.
+                number_of_requests = server.number_of_requests
+            number_of_matches_saved = arena_pipeline.champion_stats_reader.number_of_recorded_games
+        finally:
+            os.chdir(previous_working_dir_path)
+
+    return {"number_of_teams": number_of_teams, "number_of_matches_served": number_of_matches,
+            "thread_limit": thread_limit, "latency_seconds": latency_seconds, "crawl_seconds": elapsed_seconds,
+            "matches_saved": number_of_matches_saved, "requests": number_of_requests,
+            "crawl_matches_per_second": number_of_matches_saved / elapsed_seconds}
+
+
+def print_results(title: str, results: list[dict]) -> None:
+    print(title)
+    for result in results:
+        print("  " + ", ".join(f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+                               for key, value in result.items()))
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks for match storage, statistics and the crawl loop.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--teams", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--champions", type=int, default=170)
+    parser.add_argument("--crawl-matches", type=int, default=2_000)
+    parser.add_argument("--crawl-threads", type=int, default=8)
+    parser.add_argument("--crawl-latency", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    arguments = parser.parse_args()
+
+    storage_results = [benchmark_storage_and_stats(number_of_teams, number_of_matches, arguments.champions, arguments.seed)
+                       for number_of_teams in arguments.teams for number_of_matches in arguments.sizes]
+    print_results("Storage and statistics:", storage_results)
+
+    crawl_results = [benchmark_crawl(number_of_teams, arguments.crawl_matches, arguments.champions, arguments.seed,
+                                     arguments.crawl_threads, arguments.crawl_latency)
+                     for number_of_teams in arguments.teams]
+    print_results("Crawl loop against the stub Riot API:", crawl_results)
+
+    if arguments.output is not None:
+        with open(arguments.output, 'w', encoding='utf-8') as f:
+            json.dump({"storage": storage_results, "crawl": crawl_results}, f, indent=4)
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+
+ARENA_GAME_MODE_NAME = "CHERRY"
+ARENA_QUEUE_ID = 1700
+
+
+def synthetic_champion_names(number_of_champions: int) -> list[str]:
+    # Nunu is included because Riot reports it under two names, which the parser has to normalise.
+    names = ["nunu&willump"] + [f"champion{i:03d}" for i in range(number_of_champions - 1)]
+    return sorted(names)
+
+
+class SyntheticMatchGenerator:
+    def __init__(self, number_of_teams: int, champion_names: list[str], number_of_players: int = 10_000,
+                 seed: int = 0, non_arena_fraction: float = 0.0):
+        self.number_of_teams = number_of_teams
+        self.champion_names = champion_names
+        self.number_of_players = number_of_players
+        self.non_arena_fraction = non_arena_fraction
+        self.__random = random.Random(seed)
+        # Skewed champion popularity and a hidden strength per champion, so the rankings have something to find.
+        self.__champion_weights = [1.0 / (rank + 1) ** 0.5 for rank in range(len(champion_names))]
+        self.__champion_strengths = {champion_name: self.__random.gauss(0.0, 1.0) for champion_name in champion_names}
+
+    def puuid(self, player_index: int) -> str:
+        return f"synthetic-puuid-{player_index:07d}"
+
+    def match_id(self, match_index: int) -> str:
+        return f"EUW1_{7_000_000_000 + match_index}"
+
+    def match_detail(self, match_index: int) -> dict:
+        number_of_players = self.number_of_teams * 2
+        champion_names = self.__sample_champion_names(number_of_players)
+        team_strengths = [self.__champion_strengths[champion_names[2 * team]] +
+                          self.__champion_strengths[champion_names[2 * team + 1]] + self.__random.gauss(0.0, 2.0)
+                          for team in range(self.number_of_teams)]
+        placements = [0] * self.number_of_teams
+        for placement, team in enumerate(sorted(range(self.number_of_teams), key=lambda t: -team_strengths[t]), start=1):
+            placements[team] = placement
+
+        puuids = [self.puuid(self.__random.randrange(self.number_of_players)) for _ in range(number_of_players)]
+        participants = []
+        for player in range(number_of_players):
+            team = player // 2
+            champion_name = champion_names[player]
+            participants.append({"puuid": puuids[player],
+                                 "championName": "Nunu" if champion_name == "nunu&willump" else champion_name.capitalize(),
+                                 "playerSubteamId": team + 1,
+                                 "placement": placements[team]})
+
+        is_arena = self.__random.random() >= self.non_arena_fraction
+        return {"metadata": {"matchId": self.match_id(match_index), "participants": puuids},
+                "info": {"gameMode": ARENA_GAME_MODE_NAME if is_arena else "CLASSIC",
+                         "queueId": ARENA_QUEUE_ID if is_arena else 420,
+                         "gameCreation": 1_700_000_000_000 + match_index * 60_000,
+                         "gameEndTimestamp": 1_700_000_000_000 + match_index * 60_000 + 1_500_000,
+                         "participants": participants}}
+
+    def match_details(self, number_of_matches: int, start: int = 0) -> Iterator[dict]:
+        for match_index in range(start, start + number_of_matches):
+            yield self.match_detail(match_index)
+
+    def __sample_champion_names(self, number_of_champions: int) -> list[str]:
+        champion_names = []
+        while len(champion_names) < number_of_champions:
+            champion_name = self.__random.choices(self.champion_names, self.__champion_weights)[0]
+            if champion_name not in champion_names:
+                champion_names.append(champion_name)
+        return champion_names
+
+
+def write_empty_data_files(dir_path: str, champion_names: list[str], number_of_teams: int) -> tuple[str, str]:
+    # The writers read champion_names.csv from the working directory, so benchmarks run from inside `dir_path`.
+    pd.DataFrame(columns=champion_names).to_csv(os.path.join(dir_path, "champion_names.csv"), index=False)
+
+    placement_columns = ["champion_names"] + [f"{champion_name}_{i}" for champion_name in champion_names
+                                              for i in range(1, number_of_teams + 1)]
+    placements_file_name = f"champion_placements_team{number_of_teams}.csv"
+    pd.DataFrame(np.zeros((len(champion_names), len(placement_columns)), dtype=np.int32),
+                 columns=placement_columns, index=champion_names).to_csv(os.path.join(dir_path, placements_file_name))
+
+    recorded_games_file_name = f"recorded_games_team{number_of_teams}.csv"
+    with open(os.path.join(dir_path, recorded_games_file_name), 'w'):
+        pass
+    return placements_file_name, recorded_games_file_name
@@ -0,0 +1,36 @@
+import argparse
+import os
+
+import matplotlib
+matplotlib.use("Agg")
+
+from src.arena_pipeline import ArenaPipeline
+
+CHAMPION_ICONS_DIR_PATH = "src/champion_icons"
+
+
+def main() -> None:
+    # Writes every table and figure for each Arena mode without opening a window, for scheduled report runs.
+    parser = argparse.ArgumentParser(description="Headless report of the best champions and pairs in Arena.")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--teams", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--champion-icons-dir", default=CHAMPION_ICONS_DIR_PATH)
+    parser.add_argument("--champions", type=int, default=30)
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--matrix-champions", type=int, default=20)
+    parser.add_argument("--minimum-sample-size", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    for number_of_teams in args.teams:
+        arena_pipeline = ArenaPipeline(number_of_teams, f"champion_placements_team{number_of_teams}.csv",
+                                       f"recorded_games_team{number_of_teams}.csv")
+        file_paths = arena_pipeline.generate_report(os.path.join(args.output_dir, f"arena{number_of_teams}"),
+                                                    args.champion_icons_dir, args.champions, args.pairs,
+                                                    args.matrix_champions, args.minimum_sample_size, args.workers)
+        for file_path in file_paths:
+            print(f"Saved: {file_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from dotenv import dotenv_values
+
+from src.arena_pipeline import ArenaPipeline
+
+config = dotenv_values(".env")
+CRAWL_FRONTIER_FILE_NAME = "crawl_frontier_all_modes.sqlite3"
+
+
+if __name__ == "__main__":
+    # One crawl that saves both 4-team and 8-team Arena matches, sharing the frontier, match cache and rate limits.
+    arena_pipeline_team8 = ArenaPipeline(8, "champion_placements_team8.csv", "recorded_games_team8.csv",
+                                         crawl_frontier_file_name=CRAWL_FRONTIER_FILE_NAME)
+    arena_pipeline_team4 = ArenaPipeline(4, "champion_placements_team4.csv", "recorded_games_team4.csv")
+    arena_pipeline_team8.register_config(config)
+    arena_pipeline_team8.save_matches_recursive(target_number_of_matches=10_000, other_pipelines=[arena_pipeline_team4])
@@ -1,26 +1,38 @@
 from __future__ import annotations
 
 import heapq
+import math
+from queue import Queue, Empty
 import random
+import signal
 import time
 
-import seaborn
-
 from src.print_library import print_row
 
 from src.league_library import Champion, Match
-from src.lol_api_library import get_puuid_matches, get_player_puuid, parse_match_puuids
-from src.champ_placement_writer_factory import champ_placement_writer_factory, ChampPlacementWriter
+from src.lol_api_library import (get_puuid_matches, get_player_puuid, parse_match_puuids, response_status_code,
+                                 RiotApiClient, INVALID_API_KEY_STATUS_CODES)
+from src.rate_limit_library import RateLimiter, DEVELOPMENT_KEY_RATE_LIMITS
+from src.crawl_frontier_library import CrawlFrontier
+from src.match_cache_library import MatchDetailCache
+from src.streaming_pipeline_library import PipelineStage, StreamingPipeline
+from src.metrics_library import MetricsRegistry, MetricsSnapshotWriter
+from src.champ_placement_writer_factory import champ_placement_writer_factory, BaseChampPlacementWriter
 from src.pairwise_analysis_library import PairwiseChampionData
+from src.incremental_stats_library import IncrementalChampionStats
+from src.bootstrap_library import MatchBootstrap
+from src.champion_icon_library import ChampionIconCache
+from src.arena_report_library import (ArenaReport, draw_winrate_graph, draw_pairwise_winrate_graph,
+                                      draw_champion_confusion_matrix)
 import src.pairwise_analysis_print_library as papl
 
 
-from riotwatcher import LolWatcher, ApiError
+from riotwatcher import LolWatcher
+from requests import RequestException
 
-import numpy as np
+import pandas as pd
 
 import matplotlib.pyplot as plt
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 
 
 class UnregisteredConfigurationError(Exception):
@@ -29,14 +41,34 @@ class UnregisteredConfigurationError(Exception):
         super().__init__(message)
 
 
+def raise_system_exit(signal_number: int, frame) -> None:
+    raise SystemExit(f"Received signal: {signal_number}")
+
+
 class ArenaPipeline:
     ARENA_GAME_MODE_NAME = "CHERRY"
 
-    def __init__(self, number_of_teams: int, champion_placements_file_name: str, recorded_games_file_name: str):
+    def __init__(self, number_of_teams: int, champion_placements_file_name: str, recorded_games_file_name: str,
+                 match_log_file_name: str = None, crawl_frontier_file_name: str = None,
+                 match_cache_dir_path: str = "match_cache", match_cache_max_size_bytes: int = 2 * 1024 ** 3,
+                 database_file_name: str = None):
         self.__champ_placements_file_name = champion_placements_file_name
-        self.champion_stats_reader = champ_placement_writer_factory(number_of_teams, champion_placements_file_name, recorded_games_file_name)
+        if crawl_frontier_file_name is None:
+            crawl_frontier_file_name = f"crawl_frontier_team{number_of_teams}.sqlite3"
+        self.crawl_frontier_file_name = crawl_frontier_file_name
+        self.match_cache_dir_path = match_cache_dir_path
+        self.match_cache_max_size_bytes = match_cache_max_size_bytes
+        self.champion_stats_reader = champ_placement_writer_factory(number_of_teams, champion_placements_file_name,
+                                                                    recorded_games_file_name, match_log_file_name,
+                                                                    database_file_name)
         self.number_of_teams = number_of_teams
         self.__config: dict = None
+        self.metrics = MetricsRegistry()
+        self.champion_stats_reader.metrics = self.metrics
+        self.__live_stats: IncrementalChampionStats = None
+        self.__pairwise_data: PairwiseChampionData = None
+        self.__pairwise_data_cache_key: tuple[int, int] = None
+        self.__champion_icon_cache: ChampionIconCache = None
 
     def register_config(self, __config: dict) -> None:
         self.__config = __config
@@ -48,22 +80,62 @@ class ArenaPipeline:
 
     def make_empty(self) -> None:
         self.champion_stats_reader.make_empty()
+        self.__reset_live_stats()
         return None
 
     def add_new_champ(self) -> None:
         champ_input = Champion(input("Champion Name? ").lower().replace(' ', ''))
         self.champion_stats_reader.add_new_champion(champ_input)
+        self.__reset_live_stats()
+        return None
+
+    @property
+    def live_stats(self) -> IncrementalChampionStats:
+        # Kept up to date by every saved match, so rankings can be read after each match without a rebuild.
+        if self.__live_stats is None:
+            self.__live_stats = IncrementalChampionStats(list(self.champion_stats_reader.champion_ids),
+                                                         self.champion_stats_reader.placement_counts,
+                                                         team_count=self.number_of_teams)
+            self.champion_stats_reader.add_match_listener(self.__live_stats.add_match)
+        return self.__live_stats
+
+    def __reset_live_stats(self) -> None:
+        if self.__live_stats is not None:
+            self.champion_stats_reader.remove_match_listener(self.__live_stats.add_match)
+            self.__live_stats = None
+        self.__pairwise_data = None
         return None
 
+    def __load_pairwise_data(self) -> PairwiseChampionData:
+        # Reused until a match is saved or a champion added, so its cached matrices survive between plots.
+        cache_key = (self.champion_stats_reader.number_of_recorded_games, len(self.champion_stats_reader.champion_ids))
+        if self.__pairwise_data is None or self.__pairwise_data_cache_key != cache_key:
+            self.__pairwise_data = PairwiseChampionData.from_tensor(list(self.champion_stats_reader.champion_ids),
+                                                                    self.champion_stats_reader.placement_counts.copy(),
+                                                                    team_count=self.number_of_teams)
+            self.__pairwise_data_cache_key = cache_key
+        return self.__pairwise_data
+
     def get_stats(self, display_number: int) -> None:
-        pd_data = self.champion_stats_reader.load()
-        pairwise_data = PairwiseChampionData(pd_data, team_count=self.number_of_teams)
-        papl.print_number_of_matches(pairwise_data)
-        papl.print_pairwise_stats_best(pairwise_data, display_number)
+        papl.print_number_of_matches(self.live_stats)
+        papl.print_pairwise_stats_best(self.live_stats, display_number)
+        pairwise_data = self.__load_pairwise_data()
         champ_input = Champion(input("CHAMP? ").lower().replace(' ', ''))
         papl.print_champ_stats(champ_input, pairwise_data, display_number)
         return None
 
+    def get_adjusted_stats(self, display_number: int, minimum_sample_size: int = 1) -> None:
+        pairwise_data = self.__load_pairwise_data()
+        papl.print_number_of_matches(pairwise_data)
+        papl.print_adjusted_pairwise_stats_best(pairwise_data, display_number, minimum_sample_size)
+        return None
+
+    def get_bootstrap_intervals(self, number_of_replicates: int = 1000, confidence: float = 0.95,
+                                max_workers: int = None, seed: int = None) -> (pd.DataFrame, pd.DataFrame):
+        match_bootstrap = MatchBootstrap(self.champion_stats_reader.iter_match_data(),
+                                         list(self.champion_stats_reader.champion_ids))
+        return match_bootstrap.intervals(number_of_replicates, confidence, max_workers=max_workers, seed=seed)
+
     def save_matches_recent(self, summoner_name: str, player_tagline: str, region: str = "euw1", num_matches: int = 1):
         watcher = LolWatcher(self.__config["RIOT_DEV_KEY"])
         puuid = get_player_puuid(summoner_name, player_tagline, self.__config["RIOT_DEV_KEY"])
@@ -84,247 +156,401 @@ class ArenaPipeline:
         return None
 
     def save_matches_recursive(self, region: str = "euw1", target_number_of_matches: int = 1_000,
-                               num_matches_to_check_per_player: int = 10) -> None:
+                               num_matches_to_check_per_player: int = 10, flush_every_number_of_matches: int = 50,
+                               flush_interval_seconds: float = 30.0, thread_limit: int = 5, verbose: bool = True,
+                               metrics_file_path: str = None, metrics_interval_seconds: float = 10.0,
+                               other_pipelines: list[ArenaPipeline] = None) -> None:
+        # Matches for the modes of `other_pipelines` are saved to their stores too, through this pipeline's frontier,
+        # match cache and rate limits, so a fetched match is never thrown away for having the wrong number of teams.
         if not self.is_config_registered:
             raise UnregisteredConfigurationError(self)
 
         config_copy = self.__config.copy()
         config_copy["ARENA_GAME_MODE_NAME"] = self.ARENA_GAME_MODE_NAME
-        config_copy["NUMBER_OF_PLAYERS"] = self.number_of_teams * 2
 
-        match_data_scraper = MatchDataScraper(self.champion_stats_reader, config_copy)
-        match_data_scraper.get_recursive(region=region, target_number_of_matches=target_number_of_matches,
-                                         num_matches_to_check_per_player=num_matches_to_check_per_player)
+        champion_stats_readers = {self.number_of_teams: self.champion_stats_reader}
+        for other_pipeline in other_pipelines or []:
+            if other_pipeline.number_of_teams in champion_stats_readers:
+                raise ValueError(f"More than one pipeline saves {other_pipeline.number_of_teams}-team matches.")
+            champion_stats_readers[other_pipeline.number_of_teams] = other_pipeline.champion_stats_reader
+        # Every store reports to this pipeline's metrics for the crawl, so its snapshot and summary cover all modes.
+        previous_metrics = {number_of_teams: champion_stats_reader.metrics
+                            for number_of_teams, champion_stats_reader in champion_stats_readers.items()}
+        for champion_stats_reader in champion_stats_readers.values():
+            champion_stats_reader.configure_flushing(flush_every_number_of_matches, flush_interval_seconds)
+            champion_stats_reader.metrics = self.metrics
+        crawl_frontier = CrawlFrontier(self.crawl_frontier_file_name)
+        match_detail_cache = MatchDetailCache(self.match_cache_dir_path, self.match_cache_max_size_bytes)
+        match_data_scraper = MatchDataScraper(champion_stats_readers, config_copy, crawl_frontier, match_detail_cache,
+                                              metrics=self.metrics, verbose=verbose)
+        metrics_snapshot_writer = None
+        if metrics_file_path is not None:
+            metrics_snapshot_writer = MetricsSnapshotWriter(self.metrics, metrics_file_path, metrics_interval_seconds)
+            metrics_snapshot_writer.start()
+        # SIGINT already unwinds as KeyboardInterrupt, SIGTERM is turned into SystemExit so the buffer is flushed too.
+        previous_sigterm_handler = signal.signal(signal.SIGTERM, raise_system_exit)
+        try:
+            match_data_scraper.get_recursive(region=region, target_number_of_matches=target_number_of_matches,
+                                             num_matches_to_check_per_player=num_matches_to_check_per_player,
+                                             thread_limit=thread_limit)
+        finally:
+            match_data_scraper.close()
+            crawl_frontier.close()
+            for number_of_teams, champion_stats_reader in champion_stats_readers.items():
+                champion_stats_reader.configure_flushing()
+                champion_stats_reader.metrics = previous_metrics[number_of_teams]
+            if metrics_snapshot_writer is not None:
+                metrics_snapshot_writer.stop()
+            print(self.metrics.summary())
+            signal.signal(signal.SIGTERM, previous_sigterm_handler)
         return None
 
     def plot_winrate_graph(self, display_number: int, champion_icons_dir_path: str) -> None:
-        pd_data = self.champion_stats_reader.load()
-        pairwise_data = PairwiseChampionData(pd_data, team_count=self.number_of_teams)
-
-        best_champs = pairwise_data.best_champs(display_number)
-        ranks = best_champs.iloc[0].tolist()
-        sample_sizes = best_champs.iloc[1].tolist()
-        champion_names = best_champs.columns.tolist()
-        number_of_samples = pairwise_data.total_samples()
-
-        fig, ax = plt.subplots()
-
-        champion_names_labels = [f"{str(round(sample_size, 0))[:-2]} - {champion_name}" + " " * 8
-                                 for sample_size, champion_name in zip(sample_sizes, champion_names)]
-        ax.scatter(champion_names_labels, ranks, marker='x')
-        fig.suptitle(f"Best champions for {self.number_of_teams}-team Arena (Sample size: {number_of_samples})")
-        ax.set_ylabel("Average placement")
-        ax.tick_params(axis='x', rotation=90)
-        y_offset, _ = ax.get_ylim()
-
-        for i, champion_name in enumerate(champion_names):
-            icon = plt.imread(f"{champion_icons_dir_path}/{champion_name}.png")
-            icon_box = OffsetImage(icon, zoom=.2)
-            icon_box.image.axes = ax
-            position = [i, y_offset]
-            ab = AnnotationBbox(icon_box,
-                                position,
-                                frameon=False,
-                                box_alignment=(0.5, 1.2)
-                                )
-            ax.add_artist(ab)
-
-        ax.set_xlabel("Champion (Sample sizes below)")
-        fig.tight_layout()
-        fig.set_size_inches(11.5, 5.5)
+        pairwise_data = self.__load_pairwise_data()
+        fig = plt.figure()
+        draw_winrate_graph(fig, pairwise_data.best_champs(display_number), pairwise_data.total_samples(),
+                           self.number_of_teams, self.__champion_icons(champion_icons_dir_path))
         fig.savefig(f"{display_number} best champions in arena{self.number_of_teams}.png")
         plt.show()
         return None
 
     def plot_pairwise_winrate_graph(self, display_number: int, champion_icons_dir_path: str) -> None:
-        pd_data = self.champion_stats_reader.load()
-        pairwise_data = PairwiseChampionData(pd_data, team_count=self.number_of_teams)
-
+        pairwise_data = self.__load_pairwise_data()
         best_pairs = pairwise_data.best_pairs(display_number)
         print(best_pairs)
-        ranks = best_pairs.iloc[0].tolist()
-        sample_sizes = best_pairs.iloc[1].tolist()
-        champion_names = best_pairs.columns.tolist()
-        number_of_samples = pairwise_data.total_samples()
-
-        fig, ax = plt.subplots()
-
-        champion_names_labels = [f"{str(round(sample_size, 0))[:-2]} - {champion_name}" + " " * 8
-                                 for sample_size, champion_name in zip(sample_sizes, champion_names)]
-        ax.scatter(champion_names_labels, ranks, marker='x')
-        fig.suptitle(f"Best pairs for {self.number_of_teams}-team Arena (Sample size: {number_of_samples})")
-        ax.set_ylabel("Average placement")
-        ax.tick_params(axis='x', rotation=90)
-        y_offset, _ = ax.get_ylim()
-
-        ax.set_xlabel("Champion pairs (Sample sizes below)")
-        fig.tight_layout()
-        fig.set_size_inches(11.5, 5.5)
-        fig.savefig(f"{display_number} best champions in arena{self.number_of_teams}.png")
+        fig = plt.figure()
+        draw_pairwise_winrate_graph(fig, best_pairs, pairwise_data.total_samples(), self.number_of_teams)
+        fig.savefig(f"{display_number} best pairs in arena{self.number_of_teams}.png")
         plt.show()
         return None
 
     def plot_champion_confusion_matrix(self, display_number: int, champion_icons_dir_path: str) -> None:
-        pd_data = self.champion_stats_reader.load()
-        pairwise_data = PairwiseChampionData(pd_data, team_count=self.number_of_teams)
-        pairwise_data.data.drop(columns=["champion_names"], inplace=True)
+        pairwise_data = self.__load_pairwise_data()
         print(f"Number of samples: {pairwise_data.total_samples()}")
+        draw_champion_confusion_matrix(plt.figure(), pairwise_data.champion_placement_matrix(display_number))
+        plt.show()
+        return None
 
-        number_of_champs = pairwise_data.data.shape[0]
-        # This should be a weighted sum AVERAGE (arithmetic mean)
-        weights = np.array(list(range(1, 9)))
-        columns = tuple(np.dot(pairwise_data.data.iloc[:, i * self.number_of_teams: (i + 1) * self.number_of_teams].to_numpy(), weights) / np.maximum(np.sum(pairwise_data.data.iloc[:, i * self.number_of_teams: (i + 1) * self.number_of_teams].to_numpy(), axis=1), 1) for i in range(number_of_champs))
-
-        champion_names_all = self.champion_stats_reader.champion_names.columns
-        sorted_placements = tuple(sorted(((np.mean(x), i, champion_names_all[i]) for i, x in enumerate(columns))))
-        print(sorted_placements)
-        best_column_indices = {sorted_placements[i][1] for i in range(display_number) if sorted_placements[i][1] != 0}
-
-        champion_names = champion_names_all.tolist()
-        best_champion_names = [name for i, name in enumerate(champion_names) if i in best_column_indices]
+    def generate_report(self, output_dir_path: str, champion_icons_dir_path: str, champion_display_number: int = 30,
+                        pair_display_number: int = 100, matrix_display_number: int = 20, minimum_sample_size: int = 1,
+                        max_workers: int = 1) -> list[str]:
+        # Headless: every table and figure is written under `output_dir_path` and nothing is shown.
+        arena_report = ArenaReport(self.__load_pairwise_data(), self.number_of_teams, champion_icons_dir_path,
+                                   champion_display_number, pair_display_number, matrix_display_number,
+                                   minimum_sample_size)
+        return arena_report.save(output_dir_path, max_workers=max_workers)
+
+    def __champion_icons(self, champion_icons_dir_path: str) -> ChampionIconCache:
+        if self.__champion_icon_cache is None or self.__champion_icon_cache.champion_icons_dir_path != champion_icons_dir_path:
+            self.__champion_icon_cache = ChampionIconCache(champion_icons_dir_path)
+        return self.__champion_icon_cache
+
+    def export_champion_placement_matrix(self, file_path: str, display_number: int = None,
+                                         minimum_sample_size: int = 1) -> None:
+        pairwise_data = self.__load_pairwise_data()
+        pairwise_data.champion_placement_matrix(display_number, minimum_sample_size).to_csv(file_path)
+        return None
 
-        x = np.column_stack(tuple(columns[i] for i in range(len(columns)) if i in best_column_indices))
-        x = np.triu([row for i, row in enumerate(x) if i in best_column_indices])
 
-        x_masked = np.logical_not(np.bool8(x))
+class CrawledMatch:
+    def __init__(self, match_id: str, match_detail: dict | None):
+        self.match_id = match_id
+        self.match_detail = match_detail
+        self.match: Match = None
+        self.number_of_teams = 0
+        self.player_ids: list[str] = []
+        self.player_priority = 0.0
+        self.is_valid = False
+        self.is_recorded = False
+        self.is_saved = False
+        self.is_fetch_failed = False  # A transient error, the match is fetched again later.
 
-        ax = seaborn.heatmap(x, mask=x_masked, linewidths=0.5, xticklabels=best_champion_names, yticklabels=best_champion_names, annot=True, cmap="crest")
-        ax.set_ylabel("Champion 1")
-        ax.set_xlabel("Champion 2")
-        ax.set_title("Best champion pairwise average winrates matrix")
-        plt.show()
+    def __repr__(self) -> str:
+        return f"CrawledMatch(\'{self.match_id}\', valid={self.is_valid}, saved={self.is_saved})"
 
 
 class MatchDataScraper:
-
-    def __init__(self, champion_stats_reader: ChampPlacementWriter, config: dict[str, str]):
+    MATCH_REQUEST = "match"
+    PLAYER_REQUEST = "player"
+    # Only these mean the match will never be available, any other error is retried.
+    MISSING_MATCH_STATUS_CODES = (403, 404)
+    # Players seen in Arena games are far more likely to have more of them, and recent players have full histories.
+    NON_ARENA_SIGHTING_WEIGHT = 0.1
+    RECENCY_DECAY_DAYS = 14.0
+    MATCH_HISTORY_POSITION_DECAY = 0.9
+
+    def __init__(self, champion_stats_readers: dict[int, BaseChampPlacementWriter], config: dict[str, str],
+                 crawl_frontier: CrawlFrontier, match_detail_cache: MatchDetailCache = None, metrics: MetricsRegistry = None,
+                 verbose: bool = True):
+        # One store per number of teams. Every valid Arena match is routed to the store for its mode.
         self.__config = config
-        self.champion_stats_reader = champion_stats_reader
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.verbose = verbose
+        self.champion_stats_readers = champion_stats_readers
         self.ARENA_GAME_MODE_NAME = config["ARENA_GAME_MODE_NAME"]
-        self.watcher = LolWatcher(self.__config["RIOT_DEV_KEY"])
-
-        self.matches: dict[str, Match] = {}
-
-        self.match_ids_to_request = set()
-
-        self.match_ids_to_save = set()
-        self.match_ids_saved = set(self.champion_stats_reader.recorded_games.columns.tolist())
-        self.match_ids_invalid_type = set()
-
-        self.match_ids_to_check_for_players = set()
-        self.match_ids_checked_for_players = set()
-
-        self.player_ids_to_check_for_matches = set()
-        self.player_ids_checked_for_matches = set()
+        self.rate_limiter = RateLimiter(self.__config.get("RIOT_APP_RATE_LIMITS", DEVELOPMENT_KEY_RATE_LIMITS))
+        self.base_url = self.__config.get("RIOT_API_BASE_URL", RiotApiClient.RIOT_API_BASE_URL)
+        self.arena_queue_id = int(self.__config["ARENA_QUEUE_ID"]) if self.__config.get("ARENA_QUEUE_ID") else None
+        self.watcher = RiotApiClient(self.__config["RIOT_DEV_KEY"], self.rate_limiter, self.base_url, metrics=self.metrics)
+
+        self.crawl_frontier = crawl_frontier
+        self.match_detail_cache = match_detail_cache
+        self.number_of_matches_saved = 0
+        self.pipeline: StreamingPipeline = None
+        self.__region: str = None
+        self.__num_matches_to_check_per_player = 0
+        self.__started_at = time.monotonic()
+        self.__last_gauge_update_time = 0.0
 
     def get_recursive(self, region: str, target_number_of_matches: int, num_matches_to_check_per_player: int,
                       thread_limit: int=5) -> None:
 
-        puuid_seed = get_player_puuid(self.__config["MY_SUMMONER_NAME"], self.__config["MY_TAGLINE"],
-                                      self.__config["RIOT_DEV_KEY"])
-
-        self.player_ids_to_check_for_matches.add(puuid_seed)
-        rate_limit_delay = 1 / 3
-
-        i = 0
-        max_iterations = 100_000
-        c = 0
-        while i < target_number_of_matches or c >= max_iterations:
-            while self.match_ids_to_save:
-                c += 1
-                # Randomised to prevent recency bias
-                match_id = self.match_ids_to_save.pop()
-
-                if match_id not in self.matches:
-                    if not self.__add_match(match_id, region, rate_limit_delay):
-                        continue
-
-                if match_id in self.match_ids_invalid_type:
-                    print(f"Invalid match details for match_id: {match_id}")
-                    continue
-
-                match = Match.from_game_data(self.matches[match_id])
-
-                if match_id in self.match_ids_saved:
-                    print(f"Match: {match} already saved")
-                    continue
-
-                print(f"Saving match #{i}: \'{match}\'. Number of matches recorded: {len(self.match_ids_saved) + 1}")
-                print_row()
-                self.champion_stats_reader.save(match)
-                self.match_ids_saved.add(match_id)
-                del self.matches[match_id]
-                i += 1
-
-            while not self.match_ids_to_save and (self.player_ids_to_check_for_matches or self.match_ids_to_check_for_players):
-                c += 1
-                if self.player_ids_to_check_for_matches:
-                    player_id = self.player_ids_to_check_for_matches.pop()
-                    if player_id in self.player_ids_checked_for_matches:
-                        continue
-
-                    print(f"Found new player puuid: \'{player_id}\'. checking the past {num_matches_to_check_per_player} from their match history.")
-                    self.player_ids_checked_for_matches.add(player_id)
-                    time.sleep(rate_limit_delay)  # Rate limiting as to not time-out (Max 5 requests per 3 seconds)
-                    match_ids = set(get_puuid_matches(region, player_id, self.watcher, start=1,
-                                                       count=num_matches_to_check_per_player))
-                    self.match_ids_to_save |= match_ids - self.match_ids_saved
-                    self.match_ids_to_check_for_players |= match_ids - self.match_ids_checked_for_players
-
-                else:
-                    match_id = self.match_ids_to_check_for_players.pop()
-                    if match_id in self.match_ids_checked_for_players:
-                        continue
-
-                    print(f"Checking for new players in match with id: {match_id}")
-                    if match_id not in self.matches:
-                        if not self.__add_match(match_id, region, rate_limit_delay):
-                            continue
-                    self.__add_player_ids_in_match(match_id)
-
-                print_row()
-
-            if not self.player_ids_to_check_for_matches and not self.match_ids_to_check_for_players:
-                raise SystemExit("No more matches or players could be found. Try a new seed player puuid.")
-
-    def __is_valid_match_detail(self, match_detail: dict) -> bool:
-        if match_detail["info"]["gameMode"] != self.ARENA_GAME_MODE_NAME:
-            return False
+        if self.crawl_frontier.has_pending:
+            print(f"Resuming crawl from \'{self.crawl_frontier.file_path}\' with {self.crawl_frontier.number_of_pending_players} players and {self.crawl_frontier.number_of_pending_matches} matches left to check.")
+        else:
+            puuid_seed = get_player_puuid(self.__config["MY_SUMMONER_NAME"], self.__config["MY_TAGLINE"],
+                                          self.__config["RIOT_DEV_KEY"], base_url=self.base_url)
+            self.crawl_frontier.add_players([puuid_seed])
+        self.number_of_matches_saved = 0
+        self.__started_at = time.monotonic()
+        self.__region = region
+        self.__num_matches_to_check_per_player = num_matches_to_check_per_player
+
+        # Stage workers only fetch, parse and persist. All the crawl frontier state is read and written on this thread.
+        results: Queue = Queue()
+        fetch_stage = PipelineStage("fetch", self.__fetch, number_of_workers=thread_limit, max_queue_size=thread_limit)
+        parse_stage = PipelineStage("parse", self.__parse)
+        dedup_stage = PipelineStage("dedup", self.__deduplicate)
+        persist_stage = PipelineStage("persist", self.__persist, idle_handler=self.__flush_if_due)
+        fetch_stage.connect(lambda fetched: parse_stage.put(fetched) if isinstance(fetched, CrawledMatch) else results.put(fetched))
+        parse_stage.connect(lambda crawled_match: dedup_stage.put(crawled_match) if crawled_match.is_valid else results.put(crawled_match))
+        dedup_stage.connect(lambda crawled_match: results.put(crawled_match) if crawled_match.is_recorded else persist_stage.put(crawled_match))
+        persist_stage.connect(results.put)
+        self.pipeline = StreamingPipeline([fetch_stage, parse_stage, dedup_stage, persist_stage])
+
+        # Enough requests in flight to keep every stage busy, but bounded so the frontier decides what is crawled next.
+        max_requests_in_flight = 2 * thread_limit
+        number_of_requests_in_flight = 0
+        with self.pipeline:
+            while self.number_of_matches_saved < target_number_of_matches:
+                while number_of_requests_in_flight < max_requests_in_flight:
+                    request = self.__next_request()
+                    if request is None:
+                        break
+                    fetch_stage.put(request)
+                    number_of_requests_in_flight += 1
+
+                if number_of_requests_in_flight == 0:
+                    raise SystemExit("No more matches or players could be found. Try a new seed player puuid.")
+
+                self.__handle_result(self.__next_result(results))
+                number_of_requests_in_flight -= 1
+                self.__commit_crawl_frontier_if_saved()
+                self.__update_gauges_if_due()
+
+            # The quota for requests still in flight is already spent, so their responses are kept too.
+            while number_of_requests_in_flight > 0:
+                self.__handle_result(self.__next_result(results))
+                number_of_requests_in_flight -= 1
+        return None
 
-        player_count = len(match_detail["info"]["participants"])
-        if player_count != self.__config["NUMBER_OF_PLAYERS"]:
-            return False
-        return True
+    def __update_gauges_if_due(self, force: bool = False) -> None:
+        # Counting the frontier is a query, so the gauges are refreshed at most once a second.
+        now = time.monotonic()
+        if not force and now - self.__last_gauge_update_time < 1.0:
+            return None
+        self.__last_gauge_update_time = now
+        self.metrics.gauge("crawl_frontier_players", {"state": "pending"}).set(self.crawl_frontier.number_of_pending_players)
+        self.metrics.gauge("crawl_frontier_players", {"state": "checked"}).set(self.crawl_frontier.number_of_checked_players)
+        self.metrics.gauge("crawl_frontier_matches", {"state": "pending"}).set(self.crawl_frontier.number_of_pending_matches)
+        self.metrics.gauge("crawl_frontier_matches", {"state": "checked"}).set(self.crawl_frontier.number_of_checked_matches)
+        self.metrics.gauge("matches_saved_per_second").set(self.number_of_matches_saved / max(now - self.__started_at, 1e-9))
+        for stage_name, counters in self.pipeline.counters().items():
+            self.metrics.gauge("pipeline_stage_items", {"stage": stage_name}).set(counters.number_in)
+            self.metrics.gauge("pipeline_stage_busy_seconds", {"stage": stage_name}).set(counters.busy_seconds)
+        return None
 
-    def __save_match(self, match: Match) -> None:
-        self.champion_stats_reader.save(match)
+    def __print_verbose(self, message: str) -> None:
+        if self.verbose:
+            print(message)
         return None
 
-    def __add_match(self, match_id: str, region: str, rate_limit_delay: float= 1 / 3) -> bool:
-        time.sleep(rate_limit_delay)  # Rate limiting as to not time-out (Max 5 requests per 3 seconds)
+    def __next_result(self, results: Queue) -> CrawledMatch | tuple[str, list[str] | None]:
+        while True:
+            try:
+                return results.get(timeout=1.0)
+            except Empty:
+                self.pipeline.raise_if_failed()
+
+    def __fetch(self, request: tuple[str, str]) -> CrawledMatch | tuple[str, list[str] | None]:
+        request_type, request_id = request
+        if request_type == self.MATCH_REQUEST:
+            crawled_match = CrawledMatch(request_id, None)
+            try:
+                crawled_match.match_detail = self.__fetch_match(request_id, self.__region)
+            except RequestException as e:
+                crawled_match.is_fetch_failed = response_status_code(e) not in self.MISSING_MATCH_STATUS_CODES
+                print(f"Error occurred for match id: \'{request_id}\'")
+                print(e)
+                print(f"{'Retrying' if crawled_match.is_fetch_failed else 'Skipping'} match id: \'{request_id}\'")
+            return crawled_match
         try:
-            match_detail = self.watcher.match.by_id(region, match_id)
-        except ApiError as e:
-            print(f"Error occurred for match id: \'{match_id}\'")
+            match_ids = get_puuid_matches(self.__region, request_id, self.watcher, start=1,
+                                          count=self.__num_matches_to_check_per_player, queue=self.arena_queue_id)
+        except RequestException as e:
+            # An invalid key fails every request, so it still stops the crawl. Anything else is retried.
+            if response_status_code(e) in INVALID_API_KEY_STATUS_CODES:
+                raise e
+            print(f"Error occurred for player puuid: \'{request_id}\'")
             print(e)
-            print(f"Skipping match id: \'{match_id}\'")
-            return False
+            return request_id, None
+        return request_id, match_ids
 
+    def __parse(self, crawled_match: CrawledMatch) -> CrawledMatch:
+        match_detail = crawled_match.match_detail
         if match_detail is None:
-            return False
+            return crawled_match
+
+        crawled_match.player_ids = parse_match_puuids(match_detail)
+        crawled_match.player_priority = self.__player_sighting_priority(match_detail)
+        crawled_match.is_valid = self.__is_valid_match_detail(match_detail)
+        if not crawled_match.is_valid:
+            self.__print_verbose(f"Invalid match details for match_id: {crawled_match.match_id}")
+            return crawled_match
+        crawled_match.match = Match.from_game_data(match_detail)
+        crawled_match.number_of_teams = len(crawled_match.match.teams)
+        return crawled_match
+
+    def __deduplicate(self, crawled_match: CrawledMatch) -> CrawledMatch:
+        champion_stats_reader = self.champion_stats_readers[crawled_match.number_of_teams]
+        crawled_match.is_recorded = champion_stats_reader.is_recorded(crawled_match.match_id)
+        if crawled_match.is_recorded:
+            self.__print_verbose(f"Match: {crawled_match.match_id} already saved")
+        return crawled_match
+
+    def __persist(self, crawled_match: CrawledMatch) -> CrawledMatch:
+        # Saving buffers the match, the writer flushes in batches and this stage flushes on its own when idle.
+        with self.metrics.histogram("placement_writer_save_seconds").time():
+            self.champion_stats_readers[crawled_match.number_of_teams].save(crawled_match.match)
+        crawled_match.is_saved = True
+        return crawled_match
+
+    def __flush_if_due(self) -> None:
+        for champion_stats_reader in self.champion_stats_readers.values():
+            champion_stats_reader.flush_if_due()
+        return None
 
-        self.matches[match_id] = match_detail
-        if not self.__is_valid_match_detail(match_detail):
-            self.match_ids_invalid_type.add(match_id)
+    def __handle_result(self, result: CrawledMatch | tuple[str, list[str] | None]) -> None:
+        if isinstance(result, CrawledMatch):
+            self.__handle_crawled_match(result)
+        else:
+            self.__handle_player_match_ids(*result)
+        if self.verbose:
+            print_row()
+        return None
 
-        return True
+    def __commit_crawl_frontier_if_saved(self) -> None:
+        # A checked match is only committed once it is durable in its store, so a crash can never skip it.
+        if all(champion_stats_reader.number_of_pending_matches == 0 for champion_stats_reader in self.champion_stats_readers.values()):
+            self.crawl_frontier.commit()
+        return None
+
+    def close(self) -> None:
+        for champion_stats_reader in self.champion_stats_readers.values():
+            champion_stats_reader.close()
+        self.crawl_frontier.commit()
+        if self.pipeline is not None:
+            # However the crawl ended, including SystemExit from SIGTERM or an empty frontier, the final metrics
+            # snapshot gets up to date gauges.
+            self.__update_gauges_if_due(force=True)
+            self.pipeline.print_counters()
+        if self.match_detail_cache is not None:
+            cache = self.match_detail_cache
+            print(f"Match cache hit rate: {cache.hit_rate:.1%} ({cache.hits} hits, {cache.misses} misses). {cache}")
+        return None
 
-    def __add_player_ids_in_match(self, match_id: str) -> None:
-        self.match_ids_checked_for_players.add(match_id)
+    def __next_request(self) -> tuple[str, str] | None:
+        # Matches first, since only they can be saved.
+        match_id = self.crawl_frontier.pop_match()
+        if match_id is not None:
+            return self.MATCH_REQUEST, match_id
 
-        match_puuids = set(parse_match_puuids(self.matches[match_id]))
-        valid_player_ids = match_puuids - self.player_ids_checked_for_matches
-        print(f"Found {len(valid_player_ids)} valid NEW player ids")
-        self.player_ids_to_check_for_matches |= valid_player_ids
-        print(f"Number of player ids to check for matches: {len(self.player_ids_to_check_for_matches)}")
+        player_id = self.crawl_frontier.pop_player()
+        if player_id is not None:
+            return self.PLAYER_REQUEST, player_id
+        return None
+
+    def __fetch_match(self, match_id: str, region: str) -> dict | None:
+        if self.match_detail_cache is not None:
+            match_detail = self.match_detail_cache.get(match_id)
+            self.metrics.counter("match_cache_lookups_total", {"result": "miss" if match_detail is None else "hit"}).increment()
+            if match_detail is not None:
+                return match_detail
+
+        match_detail = self.watcher.match.by_id(region, match_id)
+        if self.match_detail_cache is not None and match_detail is not None:
+            self.match_detail_cache.put(match_id, match_detail)
+        return match_detail
+
+    def __handle_player_match_ids(self, player_id: str, match_ids: list[str] | None) -> None:
+        if match_ids is None:
+            self.metrics.counter("players_fetch_failed_total").increment()
+            if self.crawl_frontier.retry_player(player_id):
+                self.__print_verbose(f"Retrying player puuid: \'{player_id}\'")
+            else:
+                self.__print_verbose(f"Giving up on player puuid: \'{player_id}\' after {self.crawl_frontier.MAX_FETCH_ATTEMPTS} failed fetches")
+            return None
+        # Match histories are newest first, and a match found through a promising player inherits their priority.
+        player_priority = 1.0 + self.crawl_frontier.player_priority(player_id)
+        priorities = [player_priority * self.MATCH_HISTORY_POSITION_DECAY ** i for i in range(len(match_ids))]
+        number_of_new_matches = self.crawl_frontier.add_matches(match_ids, priorities)
+        self.crawl_frontier.mark_player_checked(player_id)
+        self.metrics.counter("players_checked_total").increment()
+        self.__print_verbose(f"Checked new player puuid: \'{player_id}\'. Found {number_of_new_matches} new matches in their match history.")
+        return None
+
+    def __handle_crawled_match(self, crawled_match: CrawledMatch) -> None:
+        self.metrics.counter("matches_checked_total", {"outcome": self.__match_outcome(crawled_match)}).increment()
+        if crawled_match.is_fetch_failed:
+            if not self.crawl_frontier.retry_match(crawled_match.match_id):
+                self.__print_verbose(f"Giving up on match id: \'{crawled_match.match_id}\' after {self.crawl_frontier.MAX_FETCH_ATTEMPTS} failed fetches")
+            return None
+        if crawled_match.is_saved:
+            self.number_of_matches_saved += 1
+            self.metrics.counter("matches_saved_total", {"number_of_teams": crawled_match.number_of_teams}).increment()
+            champion_stats_reader = self.champion_stats_readers[crawled_match.number_of_teams]
+            self.__print_verbose(f"Saving {crawled_match.number_of_teams}-team match #{self.number_of_matches_saved}: \'{crawled_match.match}\'. Number of matches recorded: {champion_stats_reader.number_of_recorded_games}")
+
+        if crawled_match.match_detail is not None:
+            number_of_new_player_ids = self.crawl_frontier.add_players(crawled_match.player_ids, crawled_match.player_priority)
+            self.__print_verbose(f"Found {number_of_new_player_ids} valid NEW player ids")
+        self.crawl_frontier.mark_match_checked(crawled_match.match_id, crawled_match.is_valid)
+        return None
+
+    @staticmethod
+    def __match_outcome(crawled_match: CrawledMatch) -> str:
+        if crawled_match.is_fetch_failed:
+            return "failed"
+        if crawled_match.match_detail is None:
+            return "missing"
+        if not crawled_match.is_valid:
+            return "invalid"
+        if crawled_match.is_recorded:
+            return "duplicate"
+        return "saved"
+
+    def __is_valid_match_detail(self, match_detail: dict) -> bool:
+        if match_detail["info"]["gameMode"] != self.ARENA_GAME_MODE_NAME:
+            return False
+
+        player_count = len(match_detail["info"]["participants"])
+        if player_count & 1 or player_count // 2 not in self.champion_stats_readers:
+            return False
         return True
+
+    def __player_sighting_priority(self, match_detail: dict) -> float:
+        match_info = match_detail["info"]
+        weight = 1.0 if match_info["gameMode"] == self.ARENA_GAME_MODE_NAME else self.NON_ARENA_SIGHTING_WEIGHT
+        game_end_timestamp = match_info.get("gameEndTimestamp", match_info.get("gameCreation", 0)) / 1000
+        age_days = max(0.0, time.time() - game_end_timestamp) / (24 * 60 * 60)
+        return weight * math.exp(-age_days / self.RECENCY_DECAY_DAYS)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.offsetbox import AnnotationBbox
+import numpy as np
+import pandas as pd
+import seaborn
+
+from src.champion_icon_library import ChampionIconAtlas, ChampionIconCache
+from src.pairwise_analysis_library import PairwiseChampionData
+
+
+def draw_winrate_graph(fig: Figure, best_champs: pd.DataFrame, number_of_samples: int, number_of_teams: int,
+                       champion_icons: ChampionIconCache) -> None:
+    ranks = best_champs.iloc[0].tolist()
+    sample_sizes = best_champs.iloc[1].tolist()
+    champion_names = best_champs.columns.tolist()
+
+    ax = fig.subplots()
+    champion_names_labels = [f"{str(round(sample_size, 0))[:-2]} - {champion_name}" + " " * 8
+                             for sample_size, champion_name in zip(sample_sizes, champion_names)]
+    ax.scatter(champion_names_labels, ranks, marker='x')
+    fig.suptitle(f"Best champions for {number_of_teams}-team Arena (Sample size: {number_of_samples})")
+    ax.set_ylabel("Average placement")
+    ax.tick_params(axis='x', rotation=90)
+    y_offset, _ = ax.get_ylim()
+
+    for i, champion_name in enumerate(champion_names):
+        icon_box = champion_icons.offset_image(champion_name)
+        icon_box.image.axes = ax
+        position = [i, y_offset]
+        ab = AnnotationBbox(icon_box,
+                            position,
+                            frameon=False,
+                            box_alignment=(0.5, 1.2)
+                            )
+        ax.add_artist(ab)
+
+    ax.set_xlabel("Champion (Sample sizes below)")
+    fig.tight_layout()
+    fig.set_size_inches(11.5, 5.5)
+    return None
+
+
+def draw_pairwise_winrate_graph(fig: Figure, best_pairs: pd.DataFrame, number_of_samples: int,
+                                number_of_teams: int) -> None:
+    ranks = best_pairs.iloc[0].tolist()
+    sample_sizes = best_pairs.iloc[1].tolist()
+    champion_names = best_pairs.columns.tolist()
+
+    ax = fig.subplots()
+    champion_names_labels = [f"{str(round(sample_size, 0))[:-2]} - {champion_name}" + " " * 8
+                             for sample_size, champion_name in zip(sample_sizes, champion_names)]
+    ax.scatter(champion_names_labels, ranks, marker='x')
+    fig.suptitle(f"Best pairs for {number_of_teams}-team Arena (Sample size: {number_of_samples})")
+    ax.set_ylabel("Average placement")
+    ax.tick_params(axis='x', rotation=90)
+
+    ax.set_xlabel("Champion pairs (Sample sizes below)")
+    fig.tight_layout()
+    fig.set_size_inches(11.5, 5.5)
+    return None
+
+
+def draw_champion_confusion_matrix(fig: Figure, placement_matrix: pd.DataFrame) -> None:
+    # The matrix is symmetric, so only the upper triangle is drawn, and pairs never seen together are left blank.
+    is_hidden = np.tril(np.ones(placement_matrix.shape, dtype=bool), k=-1) | placement_matrix.isna().to_numpy()
+
+    ax = fig.subplots()
+    seaborn.heatmap(placement_matrix, mask=is_hidden, linewidths=0.5, annot=True, fmt=".2f", cmap="crest", ax=ax)
+    ax.set_ylabel("Champion 1")
+    ax.set_xlabel("Champion 2")
+    ax.set_title("Best champion pairwise average winrates matrix")
+    return None
+
+
+# Set once per worker process by `initialise_report_worker`, so every figure a worker renders shares its icon atlas.
+report_worker_icons: dict[str, ChampionIconCache] = {}
+
+
+def initialise_report_worker(champion_icons_dir_path: str) -> None:
+    report_worker_icons.clear()
+    report_worker_icons["icons"] = ChampionIconCache(champion_icons_dir_path)
+    return None
+
+
+def render_report_figure(figure_name: str, file_path: str, statistics: dict,
+                         champion_icons: ChampionIconCache = None) -> str:
+    # Figures are drawn straight onto an Agg canvas, never through pyplot, so nothing is shown and no GUI backend or
+    # display is needed.
+    if champion_icons is None:
+        champion_icons = report_worker_icons["icons"]
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    if figure_name == "best_champs":
+        draw_winrate_graph(fig, statistics["best_champs"], statistics["number_of_samples"],
+                           statistics["number_of_teams"], champion_icons)
+    elif figure_name == "best_pairs":
+        draw_pairwise_winrate_graph(fig, statistics["best_pairs"], statistics["number_of_samples"],
+                                    statistics["number_of_teams"])
+    elif figure_name == "champion_placement_matrix":
+        fig.set_size_inches(14, 11)
+        draw_champion_confusion_matrix(fig, statistics["champion_placement_matrix"])
+        fig.tight_layout()
+    else:
+        raise ValueError(f"There is no report figure called: \'{figure_name}\'.")
+    fig.savefig(file_path)
+    return file_path
+
+
+class ArenaReport:
+    # Every table and figure for one Arena mode, computed from a single load of the placement counts.
+    def __init__(self, pairwise_data: PairwiseChampionData, number_of_teams: int, champion_icons_dir_path: str,
+                 champion_display_number: int = 30, pair_display_number: int = 100, matrix_display_number: int = 20,
+                 minimum_sample_size: int = 1):
+        self.number_of_teams = number_of_teams
+        self.champion_icons_dir_path = champion_icons_dir_path
+        self.champion_display_number = champion_display_number
+        self.pair_display_number = pair_display_number
+        self.matrix_display_number = matrix_display_number
+        self.statistics = {"number_of_teams": number_of_teams,
+                           "number_of_samples": pairwise_data.total_samples(),
+                           "best_champs": pairwise_data.best_champs(champion_display_number, minimum_sample_size),
+                           "best_pairs": pairwise_data.best_pairs(pair_display_number, minimum_sample_size),
+                           "adjusted_best_champs": pairwise_data.adjusted_best_champs(champion_display_number,
+                                                                                      minimum_sample_size),
+                           "adjusted_best_pairs": pairwise_data.adjusted_best_pairs(pair_display_number,
+                                                                                    minimum_sample_size),
+                           "champion_placement_matrix": pairwise_data.champion_placement_matrix(matrix_display_number,
+                                                                                                minimum_sample_size)}
+
+    def __repr__(self) -> str:
+        return f"ArenaReport({self.number_of_teams} teams, {self.statistics['number_of_samples']} samples)"
+
+    @property
+    def table_file_names(self) -> dict[str, str]:
+        return {"best_champs": f"{self.champion_display_number} best champions in arena{self.number_of_teams}.csv",
+                "adjusted_best_champs": f"{self.champion_display_number} adjusted best champions in arena{self.number_of_teams}.csv",
+                "best_pairs": f"{self.pair_display_number} best pairs in arena{self.number_of_teams}.csv",
+                "adjusted_best_pairs": f"{self.pair_display_number} adjusted best pairs in arena{self.number_of_teams}.csv",
+                "champion_placement_matrix": f"{self.matrix_display_number} champion placement matrix in arena{self.number_of_teams}.csv"}
+
+    @property
+    def figure_file_names(self) -> dict[str, str]:
+        return {"best_champs": f"{self.champion_display_number} best champions in arena{self.number_of_teams}.png",
+                "best_pairs": f"{self.pair_display_number} best pairs in arena{self.number_of_teams}.png",
+                "champion_placement_matrix": f"{self.matrix_display_number} champion placement matrix in arena{self.number_of_teams}.png"}
+
+    def save(self, output_dir_path: str, max_workers: int = 1) -> list[str]:
+        # Figures are rendered one after another by default. With only three figures, starting the worker processes
+        # and importing matplotlib in each costs about as much as it saves, so a pool is only used when `max_workers`
+        # asks for more than one, each worker memory-mapping the icon atlas.
+        os.makedirs(output_dir_path, exist_ok=True)
+        file_paths = []
+        for table_name, file_name in self.table_file_names.items():
+            file_path = os.path.join(output_dir_path, file_name)
+            self.statistics[table_name].to_csv(file_path)
+            file_paths.append(file_path)
+
+        figure_jobs = [(figure_name, os.path.join(output_dir_path, file_name))
+                       for figure_name, file_name in self.figure_file_names.items()]
+        if max_workers <= 1:
+            champion_icons = ChampionIconCache(self.champion_icons_dir_path)
+            file_paths += [render_report_figure(figure_name, file_path, self.statistics, champion_icons)
+                           for figure_name, file_path in figure_jobs]
+            return file_paths
+
+        ChampionIconAtlas.load_or_build(self.champion_icons_dir_path)  # Built once here, the workers only map it.
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initialise_report_worker,
+                                 initargs=(self.champion_icons_dir_path,)) as executor:
+            futures = [executor.submit(render_report_figure, figure_name, file_path, self.statistics)
+                       for figure_name, file_path in figure_jobs]
+            file_paths += [future.result() for future in futures]
+        return file_paths
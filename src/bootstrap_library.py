@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Set once per worker process by `initialise_bootstrap_worker`, so the team arrays are not pickled for every batch.
+bootstrap_worker_arrays: dict[str, np.ndarray] = {}
+
+
+def initialise_bootstrap_worker(arrays: dict[str, np.ndarray]) -> None:
+    bootstrap_worker_arrays.clear()
+    bootstrap_worker_arrays.update(arrays)
+    return None
+
+
+def bootstrap_replicate_averages(seed: np.random.SeedSequence, number_of_replicates: int,
+                                 arrays: dict[str, np.ndarray] = None) -> (np.ndarray, np.ndarray):
+    if arrays is None:
+        arrays = bootstrap_worker_arrays
+    rng = np.random.default_rng(seed)
+    number_of_matches = int(arrays["number_of_matches"])
+    number_of_champions = int(arrays["number_of_champions"])
+    number_of_pairs = int(arrays["number_of_pairs"])
+
+    champion_averages = np.empty((number_of_replicates, number_of_champions), dtype=np.float32)
+    pair_averages = np.empty((number_of_replicates, number_of_pairs), dtype=np.float32)
+    for replicate in range(number_of_replicates):
+        # Resampling M matches with replacement is the same as weighting each match by a Multinomial(M, 1/M) count.
+        match_weights = np.bincount(rng.integers(0, number_of_matches, number_of_matches), minlength=number_of_matches)
+        team_weights = match_weights[arrays["team_match_indices"]].astype(np.float64)
+        champion_averages[replicate], pair_averages[replicate] = weighted_placement_averages(team_weights, arrays)
+    return champion_averages, pair_averages
+
+
+def weighted_placement_averages(team_weights: np.ndarray, arrays: dict[str, np.ndarray]) -> (np.ndarray, np.ndarray):
+    number_of_champions = int(arrays["number_of_champions"])
+    number_of_pairs = int(arrays["number_of_pairs"])
+    weighted_placements = team_weights * arrays["team_placements"]
+
+    champion_sample_sizes = np.bincount(arrays["team_champion1_ids"], team_weights, number_of_champions)
+    champion_sample_sizes += np.bincount(arrays["team_champion2_ids"], team_weights, number_of_champions)
+    champion_placement_sums = np.bincount(arrays["team_champion1_ids"], weighted_placements, number_of_champions)
+    champion_placement_sums += np.bincount(arrays["team_champion2_ids"], weighted_placements, number_of_champions)
+
+    pair_sample_sizes = np.bincount(arrays["team_pair_ids"], team_weights, number_of_pairs)
+    pair_placement_sums = np.bincount(arrays["team_pair_ids"], weighted_placements, number_of_pairs)
+    # A champion or pair missing from a replicate has no average, it is NaN and skipped by the percentiles.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return champion_placement_sums / champion_sample_sizes, pair_placement_sums / pair_sample_sizes
+
+
+class MatchBootstrap:
+    def __init__(self, match_data: Iterable[dict], champion_names: list[str]):
+        self.champion_names = pd.Index(champion_names)
+        champion_ids = {champion_name: i for i, champion_name in enumerate(champion_names)}
+
+        team_match_indices = []
+        team_champion1_ids = []
+        team_champion2_ids = []
+        team_placements = []
+        number_of_matches = 0
+        for match_index, data in enumerate(match_data):
+            for (champion1, champion2), placement in zip(data["teams"], data["scoreboard"]):
+                team_match_indices.append(match_index)
+                team_champion1_ids.append(champion_ids[champion1])
+                team_champion2_ids.append(champion_ids[champion2])
+                team_placements.append(placement)
+            number_of_matches = match_index + 1
+        self.number_of_matches = number_of_matches
+
+        team_champion1_ids = np.array(team_champion1_ids, dtype=np.intp)
+        team_champion2_ids = np.array(team_champion2_ids, dtype=np.intp)
+        unordered_pair_ids = (np.minimum(team_champion1_ids, team_champion2_ids) * len(champion_names) +
+                              np.maximum(team_champion1_ids, team_champion2_ids))
+        # Only pairs that were seen at least once get a column, which keeps the replicate matrices small.
+        pair_ids, team_pair_ids = np.unique(unordered_pair_ids, return_inverse=True)
+        champion1_ids, champion2_ids = np.divmod(pair_ids, len(champion_names))
+        self.pair_names = self.champion_names[champion1_ids] + " + " + self.champion_names[champion2_ids]
+
+        self.__arrays = {"number_of_matches": np.array(number_of_matches),
+                         "number_of_champions": np.array(len(champion_names)),
+                         "number_of_pairs": np.array(pair_ids.size),
+                         "team_match_indices": np.array(team_match_indices, dtype=np.intp),
+                         "team_champion1_ids": team_champion1_ids,
+                         "team_champion2_ids": team_champion2_ids,
+                         "team_pair_ids": team_pair_ids.astype(np.intp),
+                         "team_placements": np.array(team_placements, dtype=np.float64)}
+
+    def __repr__(self) -> str:
+        return f"MatchBootstrap({self.number_of_matches} matches, {self.pair_names.size} pairs)"
+
+    def replicate_averages(self, number_of_replicates: int = 1000, batch_size: int = 50, max_workers: int = None,
+                           seed: int = None) -> (np.ndarray, np.ndarray):
+        if self.number_of_matches == 0:
+            raise ValueError("Cannot bootstrap without any recorded matches in the match log.")
+        batch_sizes = [min(batch_size, number_of_replicates - start) for start in range(0, number_of_replicates, batch_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+
+        if max_workers == 1:
+            results = [bootstrap_replicate_averages(batch_seed, size, self.__arrays) for batch_seed, size in zip(seeds, batch_sizes)]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=initialise_bootstrap_worker,
+                                     initargs=(self.__arrays,)) as executor:
+                results = list(executor.map(bootstrap_replicate_averages, seeds, batch_sizes))
+
+        champion_averages = np.concatenate([champion_batch for champion_batch, _ in results])
+        pair_averages = np.concatenate([pair_batch for _, pair_batch in results])
+        return champion_averages, pair_averages
+
+    def intervals(self, number_of_replicates: int = 1000, confidence: float = 0.95, batch_size: int = 50,
+                  max_workers: int = None, seed: int = None) -> (pd.DataFrame, pd.DataFrame):
+        champion_averages, pair_averages = self.replicate_averages(number_of_replicates, batch_size, max_workers, seed)
+        team_weights = np.ones(self.__arrays["team_placements"].size)
+        full_champion_averages, full_pair_averages = weighted_placement_averages(team_weights, self.__arrays)
+        champion_sample_sizes = (np.bincount(self.__arrays["team_champion1_ids"], minlength=self.champion_names.size) +
+                                 np.bincount(self.__arrays["team_champion2_ids"], minlength=self.champion_names.size))
+        pair_sample_sizes = np.bincount(self.__arrays["team_pair_ids"], minlength=self.pair_names.size)
+
+        champion_intervals = self.__interval_frame(full_champion_averages, champion_averages, champion_sample_sizes,
+                                                   self.champion_names, confidence)
+        pair_intervals = self.__interval_frame(full_pair_averages, pair_averages, pair_sample_sizes,
+                                               self.pair_names, confidence)
+        return champion_intervals, pair_intervals
+
+    @staticmethod
+    def __interval_frame(averages: np.ndarray, replicate_averages: np.ndarray, sample_sizes: np.ndarray,
+                         names: pd.Index, confidence: float) -> pd.DataFrame:
+        tail_percent = 50 * (1 - confidence)
+        sampled = sample_sizes > 0
+        lower_bounds = np.full(names.size, np.nan)
+        upper_bounds = np.full(names.size, np.nan)
+        lower_bounds[sampled], upper_bounds[sampled] = np.nanpercentile(replicate_averages[:, sampled],
+                                                                        [tail_percent, 100 - tail_percent], axis=0)
+        return pd.DataFrame({"Average placement": averages,
+                             f"Lower {confidence:.0%} bound": lower_bounds,
+                             f"Upper {confidence:.0%} bound": upper_bounds,
+                             "Sample size (n)": sample_sizes}, index=names)
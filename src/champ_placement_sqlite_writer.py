@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+import sqlite3
+from threading import RLock
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.league_library import Champion
+from src.champion_registry_library import ChampionRegistry
+from src.champ_placement_writer import ChampionNamesReader
+from src.champ_placement_writer_base import BaseChampPlacementWriter
+from src.pairwise_analysis_library import PairwiseChampionData
+
+
+class PlacementDatabaseMismatchError(Exception):
+    def __init__(self, file_path: str, reason: str):
+        message = f"The placement database: \'{file_path}\' does not match this writer, {reason}."
+        super().__init__(message)
+
+
+class SQLiteChampPlacementWriter(BaseChampPlacementWriter):
+    # Matches and their participants are stored normalised, next to an aggregate of placement counts per
+    # (champion, teammate, placement) that is updated in the same transaction. A flush is one transaction, so a crash
+    # never leaves a match recorded but not counted, and reading the counts never scans the matches.
+    def __init__(self, file_path: str, number_of_teams: int, champion_registry: ChampionRegistry = None):
+        super(SQLiteChampPlacementWriter, self).__init__(file_path)
+        self.__number_of_teams = number_of_teams
+        self.__lock = RLock()
+        self.__connection = sqlite3.connect(file_path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute("PRAGMA foreign_keys=ON")
+        self.__create_tables()
+        self.__stored_champion_counts: tuple[int, int] = self.__query("SELECT COUNT(*), COUNT(riot_champion_id) "
+                                                                      "FROM champions")[0]
+
+        # Like the file writer, one registry per number of teams. A writer for the same mode that is already open,
+        # e.g. the file writer being imported, passes its registry in, so both register champions in one place.
+        # Otherwise a database that already has champions seeds it with their ids, and failing that the shared
+        # registry from before or the champion names file does.
+        stored_champions = self.__query("SELECT name, riot_champion_id FROM champions ORDER BY champion_id")
+        if champion_registry is not None:
+            self.champion_registry = champion_registry
+        elif stored_champions:
+            self.champion_registry = ChampionRegistry.load_or_create(
+                self.champion_registry_file_path.format(number_of_teams=number_of_teams),
+                [champion_name for champion_name, _ in stored_champions])
+        else:
+            self.champion_registry = ChampionRegistry.load_or_create(
+                self.champion_registry_file_path.format(number_of_teams=number_of_teams),
+                ChampionNamesReader(self.champion_names_file_path).champion_names.columns,
+                self.shared_champion_registry_file_path)
+        for champion_name, riot_champion_id in stored_champions:
+            if riot_champion_id is not None and riot_champion_id not in self.champion_registry.riot_champion_ids:
+                self.champion_registry.register(champion_name, riot_champion_id)
+        self.champion_registry.save_if_dirty()
+        self.__champion_counts_in_transaction = self.__stored_champion_counts
+        self.__pending_game_ids: set[str] = set()
+
+        self.validate_configuration()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+        return None
+
+    def __repr__(self) -> str:
+        return f"SQLiteChampPlacementWriter(\'{self.file_path}\', {self.__number_of_teams} teams)"
+
+    def number_of_teams(self) -> int:
+        return self.__number_of_teams
+
+    def __create_tables(self) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS metadata ("
+                                      "key TEXT PRIMARY KEY, "
+                                      "value TEXT NOT NULL)")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS champions ("
+                                      "champion_id INTEGER PRIMARY KEY, "
+                                      "name TEXT NOT NULL UNIQUE, "
+                                      "riot_champion_id INTEGER)")
+            if "riot_champion_id" not in {row[1] for row in self.__connection.execute("PRAGMA table_info(champions)")}:
+                self.__connection.execute("ALTER TABLE champions ADD COLUMN riot_champion_id INTEGER")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS matches ("
+                                      "match_id INTEGER PRIMARY KEY, "
+                                      "game_id TEXT NOT NULL UNIQUE)")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS participants ("
+                                      "match_id INTEGER NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE, "
+                                      "team INTEGER NOT NULL, "
+                                      "slot INTEGER NOT NULL, "
+                                      "champion_id INTEGER NOT NULL REFERENCES champions (champion_id), "
+                                      "placement INTEGER NOT NULL, "
+                                      "PRIMARY KEY (match_id, team, slot)) WITHOUT ROWID")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS participants_champion ON participants (champion_id)")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS placements ("
+                                      "champion_id INTEGER NOT NULL REFERENCES champions (champion_id), "
+                                      "teammate_id INTEGER NOT NULL REFERENCES champions (champion_id), "
+                                      "placement INTEGER NOT NULL, "
+                                      "count INTEGER NOT NULL, "
+                                      "PRIMARY KEY (champion_id, teammate_id, placement)) WITHOUT ROWID")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS placements_teammate ON placements (teammate_id)")
+            self.__connection.execute("INSERT OR IGNORE INTO metadata (key, value) VALUES ('number_of_teams', ?)",
+                                      (str(self.__number_of_teams),))
+        return None
+
+    def validate_configuration(self) -> None:
+        number_of_teams = int(self.__query("SELECT value FROM metadata WHERE key = 'number_of_teams'")[0][0])
+        if number_of_teams != self.__number_of_teams:
+            raise PlacementDatabaseMismatchError(self.file_path, f"it holds {number_of_teams} team matches, not {self.__number_of_teams}")
+        for champion_id, champion_name in self.__query("SELECT champion_id, name FROM champions"):
+            if self.champion_registry.ids.get(champion_name) != champion_id:
+                raise PlacementDatabaseMismatchError(self.file_path, f"the champion: \'{champion_name}\' has a different id "
+                                                                     f"in \'{self.champion_registry.file_path}\'")
+        return None
+
+    def close(self) -> None:
+        # Like the file writer, closing only makes everything durable, so the writer can still be read afterwards.
+        with self.__lock:
+            self.flush()
+            self.__connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        return None
+
+    @property
+    def number_of_recorded_games(self) -> int:
+        with self.__lock:
+            return self.__count("matches") + len(self.__pending_game_ids)
+
+    @property
+    def recorded_game_ids(self) -> frozenset[str]:
+        return frozenset(game_id for game_id, in self.__query("SELECT game_id FROM matches")) | self.__pending_game_ids
+
+    def is_recorded(self, game_id: str) -> bool:
+        if game_id in self.__pending_game_ids:
+            return True
+        return bool(self.__query("SELECT 1 FROM matches WHERE game_id = ?", (game_id,)))
+
+    def _add_pending_match_data(self, match_data: dict) -> None:
+        with self.__lock:
+            self._pending_match_data.append(match_data)
+            self.__pending_game_ids.add(match_data["game_id"])
+        return None
+
+    def flush(self) -> None:
+        with self.__lock:
+            if self._pending_match_data:
+                with self.metrics.histogram("placement_writer_flush_seconds").time(), self.__transaction():
+                    self.__insert_match_data(self._pending_match_data)
+                self.metrics.counter("placement_writer_matches_flushed_total").increment(len(self._pending_match_data))
+            self._pending_match_data = []
+            self.__pending_game_ids = set()
+            self._last_flush_time = time.monotonic()
+        return None
+
+    def save_snapshot(self) -> None:
+        # Every flush is already durable, there is no separate snapshot to write.
+        self.flush()
+        return None
+
+    def __insert_match_data(self, match_data: list[dict], count_placements: bool = True) -> None:
+        # Runs inside the caller's transaction.
+        champion_ids = self.champion_registry.ids
+        participant_rows = []
+        placement_deltas = Counter()
+        self.champion_registry.save_if_dirty()
+        self.__store_champions()
+        for data in match_data:
+            match_id = self.__connection.execute("INSERT INTO matches (game_id) VALUES (?)", (data["game_id"],)).lastrowid
+            for team, ((champion1, champion2), placement) in enumerate(zip(data["teams"], data["scoreboard"])):
+                champion1_id = champion_ids[champion1]
+                champion2_id = champion_ids[champion2]
+                participant_rows += ((match_id, team, 0, champion1_id, placement), (match_id, team, 1, champion2_id, placement))
+                placement_deltas[champion1_id, champion2_id, placement] += 1
+                placement_deltas[champion2_id, champion1_id, placement] += 1
+
+        self.__connection.executemany("INSERT INTO participants (match_id, team, slot, champion_id, placement) "
+                                      "VALUES (?, ?, ?, ?, ?)", participant_rows)
+        if count_placements:
+            self.__add_placement_counts((champion_id, teammate_id, placement, count)
+                                        for (champion_id, teammate_id, placement), count in placement_deltas.items())
+        return None
+
+    def __add_placement_counts(self, rows) -> None:
+        self.__connection.executemany("INSERT INTO placements (champion_id, teammate_id, placement, count) "
+                                      "VALUES (?, ?, ?, ?) "
+                                      "ON CONFLICT (champion_id, teammate_id, placement) "
+                                      "DO UPDATE SET count = count + excluded.count", rows)
+        return None
+
+    def __store_champions(self) -> None:
+        # New champions are inserted and newly learnt Riot championIds are set on the ones already stored, so a
+        # registry rebuilt from the database keeps both.
+        champion_counts = (len(self.champion_registry), len(self.champion_registry.riot_champion_ids))
+        if self.__champion_counts_in_transaction == champion_counts:
+            return None
+        riot_champion_ids = {champion_id: riot_champion_id
+                             for riot_champion_id, champion_id in self.champion_registry.riot_champion_ids.items()}
+        self.__connection.executemany("INSERT INTO champions (champion_id, name, riot_champion_id) VALUES (?, ?, ?) "
+                                      "ON CONFLICT (champion_id) DO UPDATE SET riot_champion_id = excluded.riot_champion_id",
+                                      ((champion_id, champion_name, riot_champion_ids.get(champion_id))
+                                       for champion_id, champion_name in enumerate(self.champion_registry.names)))
+        self.__champion_counts_in_transaction = champion_counts
+        return None
+
+    @contextmanager
+    def __transaction(self) -> Iterator[None]:
+        # Champions inserted in a transaction only count as stored once it commits, a rollback leaves them to be
+        # inserted again by the next one.
+        with self.__lock, self.__connection:
+            self.__champion_counts_in_transaction = self.__stored_champion_counts
+            yield
+        self.__stored_champion_counts = self.__champion_counts_in_transaction
+
+    def import_from(self, champ_placement_writer: BaseChampPlacementWriter) -> None:
+        # Copies a file backed writer. Its counts may include base CSV placements with no per-match data, so the
+        # aggregate is copied as it is rather than recounted from the matches. Open this writer with the other
+        # writer's registry, so the champions it registers here are not lost when the other one saves its registry.
+        champion_names = list(champ_placement_writer.champion_ids)
+        for champion_name in champion_names:
+            self.champion_registry.register(champion_name)
+        other_champion_registry = champ_placement_writer.champion_registry
+        for riot_champion_id, champion_id in other_champion_registry.riot_champion_ids.items():
+            self.champion_registry.register(other_champion_registry.name_of(champion_id), riot_champion_id)
+        placement_counts = champ_placement_writer.placement_counts
+        champion_ids = [self.champion_registry.ids[champion_name] for champion_name in champion_names]
+
+        with self.__lock:
+            self.flush()
+            with self.__transaction():
+                self.__insert_match_data([data for data in champ_placement_writer.iter_match_data()
+                                          if not self.is_recorded(data["game_id"])], count_placements=False)
+                self.__connection.execute("DELETE FROM placements")
+                champion_indices, teammate_indices, placement_indices = np.nonzero(placement_counts)
+                self.__add_placement_counts(zip((champion_ids[i] for i in champion_indices.tolist()),
+                                                (champion_ids[i] for i in teammate_indices.tolist()),
+                                                (placement_indices + 1).tolist(),
+                                                placement_counts[champion_indices, teammate_indices, placement_indices].tolist()))
+        return None
+
+    def __query(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchall()
+
+    def __count(self, table_name: str) -> int:
+        return self.__query(f"SELECT COUNT(*) FROM {table_name}")[0][0]
+
+    @property
+    def champion_ids(self) -> dict[str, int]:
+        return {champion_name: i for i, champion_name in enumerate(self.champion_registry.names)}
+
+    @property
+    def placement_counts(self) -> np.ndarray:
+        self.flush()
+        number_of_champions = len(self.champion_registry)
+        placement_counts = np.zeros((number_of_champions, number_of_champions, self.__number_of_teams), dtype=np.int64)
+        rows = self.__query("SELECT champion_id, teammate_id, placement, count FROM placements")
+        if rows:
+            champion_indices, teammate_indices, placements, counts = np.array(rows, dtype=np.int64).T
+            placement_counts[champion_indices, teammate_indices, placements - 1] = counts
+        return placement_counts
+
+    def champion_placement_counts(self) -> pd.DataFrame:
+        # Placements per champion over all teammates, summed by the database through the primary key order.
+        self.flush()
+        placement_counts = np.zeros((len(self.champion_registry), self.__number_of_teams), dtype=np.int64)
+        for champion_id, placement, count in self.__query("SELECT champion_id, placement, SUM(count) FROM placements "
+                                                          "GROUP BY champion_id, placement"):
+            placement_counts[champion_id, placement - 1] = count
+        return pd.DataFrame(placement_counts, index=self.champion_registry.names,
+                            columns=range(1, self.__number_of_teams + 1))
+
+    def teammate_placement_counts(self, champion: Champion) -> pd.DataFrame:
+        self.flush()
+        placement_counts = np.zeros((len(self.champion_registry), self.__number_of_teams), dtype=np.int64)
+        for teammate_id, placement, count in self.__query("SELECT teammate_id, placement, count FROM placements "
+                                                          "WHERE champion_id = ?", (self.champion_registry.id_of(champion.name),)):
+            placement_counts[teammate_id, placement - 1] = count
+        return pd.DataFrame(placement_counts, index=self.champion_registry.names,
+                            columns=range(1, self.__number_of_teams + 1))
+
+    def pairwise_data(self) -> PairwiseChampionData:
+        return PairwiseChampionData.from_tensor(list(self.champion_registry.names), self.placement_counts,
+                                                self.__number_of_teams)
+
+    def iter_match_data(self, batch_size: int = 10_000) -> Iterator[dict]:
+        # Matches are read in batches in insertion order, without loading every participant at once.
+        self.flush()
+        champion_names = self.champion_registry.names
+        last_match_id = 0
+        while True:
+            rows = self.__query("SELECT m.match_id, m.game_id, p.team, p.champion_id, p.placement FROM matches m "
+                                "JOIN participants p ON p.match_id = m.match_id "
+                                "WHERE m.match_id IN (SELECT match_id FROM matches WHERE match_id > ? ORDER BY match_id LIMIT ?) "
+                                "ORDER BY m.match_id, p.team, p.slot", (last_match_id, batch_size))
+            if not rows:
+                return None
+            match_data = None
+            for match_id, game_id, team, champion_id, placement in rows:
+                if match_data is None or match_id != last_match_id:
+                    if match_data is not None:
+                        yield match_data
+                    match_data = {"game_id": game_id, "teams": [], "scoreboard": []}
+                    last_match_id = match_id
+                if team == len(match_data["teams"]):
+                    match_data["teams"].append([])
+                    match_data["scoreboard"].append(placement)
+                match_data["teams"][team].append(champion_names[champion_id])
+            yield match_data
+
+    def load(self) -> pd.DataFrame:
+        champion_names = self.champion_registry.names
+        placement_columns = [f"{champion_name}_{i}" for champion_name in champion_names
+                             for i in range(1, self.__number_of_teams + 1)]
+        data = pd.DataFrame(self.placement_counts.reshape(len(champion_names), -1), index=champion_names,
+                            columns=placement_columns)
+        data.insert(0, "champion_names", 0)
+        return data
+
+    @property
+    def _storage_description(self) -> str:
+        return f"the database: \'{self.file_path}\'"
+
+    def _clear_storage(self) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM placements")
+            self.__connection.execute("DELETE FROM participants")
+            self.__connection.execute("DELETE FROM matches")
+            self._pending_match_data = []
+            self.__pending_game_ids = set()
+        return None
+
+    def add_new_champion(self, champion: Champion) -> None:
+        if champion.name in self.champion_registry:
+            print(f"The champion: \'{champion.name}\' is already added!")
+            return None
+        self.champion_registry.register(champion.name, champion.riot_champion_id)
+        with self.__transaction():
+            self.champion_registry.save_if_dirty()
+            self.__store_champions()
+        return None
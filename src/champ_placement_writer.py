@@ -1,92 +1,275 @@
-from abc import ABC, abstractmethod
+from __future__ import annotations
 
-from bisect import insort, bisect
+from bisect import insort
+import os
+import time
 
 import numpy as np
 import pandas as pd
 
-from src.file_writers_library import FileReader, CSV_FileReader
-from src.league_library import Champion, Match
+from src.file_writers_library import CSV_FileReader, JSONLines_FileReader, NPY_FileReader
+from src.league_library import Champion, MatchBatch
+from src.champion_registry_library import ChampionRegistry
+from src.champ_placement_writer_base import BaseChampPlacementWriter
+from src.recorded_games_library import RecordedGameIndex
 
 
-class ChampPlacementWriter(FileReader, ABC):
-    champion_names_file_path = "champion_names.csv"
-
-    def __init__(self, file_path: str, recorded_games_file_path: str):
+class ChampPlacementWriter(BaseChampPlacementWriter):
+    def __init__(self, file_path: str, recorded_games_file_path: str, match_log_file_path: str = None,
+                 snapshot_file_path: str = None, recorded_game_index_file_path: str = None):
         super(ChampPlacementWriter, self).__init__(file_path)
         self._recorded_games_file_path = recorded_games_file_path
+        if match_log_file_path is None:
+            match_log_file_path = default_match_log_file_path(recorded_games_file_path)
+        self._match_log_file_path = match_log_file_path
+        if snapshot_file_path is None:
+            snapshot_file_path = default_snapshot_file_path(file_path)
+        if recorded_game_index_file_path is None:
+            recorded_game_index_file_path = default_recorded_game_index_file_path(recorded_games_file_path)
 
         self._recorded_games_reader = CSV_FileReader(recorded_games_file_path)
+        self._match_log = JSONLines_FileReader(match_log_file_path)
+        self._snapshot = NPY_FileReader(snapshot_file_path)
+        self.snapshot_every_number_of_matches = 1000
+        self.__number_of_matches_since_snapshot = 0
         self.__champ_names_file_reader = ChampionNamesReader(self.champion_names_file_path)
+        self.champion_registry = ChampionRegistry.load_or_create(
+            self.champion_registry_file_path.format(number_of_teams=self.number_of_teams()),
+            self.__champ_names_file_reader.champion_names.columns, self.shared_champion_registry_file_path)
+        self.__placement_column_names: list[str] = []
+        self.__recorded_game_ids = self.__load_recorded_game_ids(recorded_game_index_file_path)
+
+        self.__champion_ids: dict[str, int] = None
+        self.__placement_capacity: np.ndarray = None
+        self.__placement_counts: np.ndarray = None  # A view of the first C x C champions of the capacity.
 
         if self.exists and not self.is_empty:
             self.validate_configuration()
 
-    @abstractmethod
-    def number_of_teams(self) -> int:
-        raise NotImplementedError
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+        return None
 
     @property
-    def recorded_games(self) -> pd.DataFrame:
-        return self._recorded_games_reader.load()
+    def recorded_game_ids(self) -> frozenset[str]:
+        return frozenset(self.__recorded_game_ids)
 
-    def save(self, match: Match) -> None:
-        recorded_games = self.recorded_games
-        game_id = match.game_id
+    @property
+    def number_of_recorded_games(self) -> int:
+        return len(self.__recorded_game_ids)
 
-        if game_id in recorded_games.columns:
-            print(f"GameId: {game_id} already recorded. Data is not saved.")
-            return None
+    def is_recorded(self, game_id: str) -> bool:
+        return game_id in self.__recorded_game_ids
 
-        recorded_games_data: list = recorded_games.columns.tolist()
+    def _add_pending_match_data(self, match_data: dict) -> None:
+        if self.__placement_counts is not None:
+            self.__count_placements([match_data])
+        self._pending_match_data.append(match_data)
+        self.__recorded_game_ids.add(match_data["game_id"])
+        return None
 
-        recorded_games_data.append(game_id)
-        recorded_games = pd.DataFrame([], columns=recorded_games_data)
+    def flush(self) -> None:
+        self.__append_pending_match_data()
+        if self.__number_of_matches_since_snapshot >= self.snapshot_every_number_of_matches:
+            self.save_snapshot()
+        return None
 
-        recorded_games.to_csv(self._recorded_games_file_path, index=False)
-        data = self.load()
+    def __append_pending_match_data(self) -> None:
+        if self._pending_match_data:
+            with self.metrics.histogram("placement_writer_flush_seconds").time():
+                # The registry goes first, so every champion named in the match log is always registered.
+                self.champion_registry.save_if_dirty()
+                self._match_log.append(self._pending_match_data)
+                self.__recorded_game_ids.flush()
+            self.metrics.counter("placement_writer_matches_flushed_total").increment(len(self._pending_match_data))
+        self.__number_of_matches_since_snapshot += len(self._pending_match_data)
+        self._pending_match_data = []
+        self._last_flush_time = time.monotonic()
+        return None
 
-        for i, team in enumerate(match.teams):
-            champion1 = team.champions[0]
-            champion2 = team.champions[1]
-            placement = match.scoreboard[i]
-            data[f"{champion1.name}_{placement}"][champion2.name] += 1
-            data[f"{champion2.name}_{placement}"][champion1.name] += 1
+    def close(self) -> None:
+        self.save_snapshot()
+        return None
 
-        data.to_csv(self.file_path, header=True)
+    def save_snapshot(self) -> None:
+        # The snapshot must only hold matches already in the log, so its offset says exactly where replay resumes.
+        self.__append_pending_match_data()
+        if self.__placement_counts is None:
+            self.__load_placement_counts()
+        if self.__number_of_matches_since_snapshot == 0 and self._snapshot.exists:
+            return None
+        metadata = {"number_of_teams": self.number_of_teams(),
+                    "champion_names": list(self.champion_ids),
+                    "match_log_offset": self._match_log.end_offset()}
+        with self.metrics.histogram("placement_writer_snapshot_seconds").time():
+            self._snapshot.save(self.placement_counts, metadata)
+        self.__number_of_matches_since_snapshot = 0
+        return None
+
+    @property
+    def champion_ids(self) -> dict[str, int]:
+        if self.__champion_ids is None:
+            self.__load_placement_counts()
+        return self.__champion_ids
+
+    @property
+    def placement_counts(self) -> np.ndarray:
+        if self.__placement_counts is None:
+            self.__load_placement_counts()
+        return self.__placement_counts
+
+    def iter_match_data(self):
+        # Only matches in the match log, the counts imported from the base CSV carry no per-match data.
+        yield from self._match_log.iter_records()
+        yield from self._pending_match_data
 
     def load(self) -> pd.DataFrame:
+        champion_names = list(self.champion_ids)
+        number_of_champions = len(champion_names)
+        data = pd.DataFrame(self.placement_counts.reshape(number_of_champions, -1).copy(),
+                            index=champion_names, columns=self.placement_column_names)
+        data.insert(0, "champion_names", 0)
+        return data
+
+    def _load_base(self) -> pd.DataFrame:
         return pd.read_csv(self.file_path, index_col=[0])
 
+    def __load_placement_counts(self) -> None:
+        if self.__is_snapshot_usable():
+            placement_counts, metadata = self._snapshot.load()
+            self.__set_placement_counts(metadata["champion_names"], placement_counts)
+            match_log_tail = list(self._match_log.iter_records(metadata["match_log_offset"]))
+            self.__count_placements(match_log_tail + self._pending_match_data)
+            self.__number_of_matches_since_snapshot = len(match_log_tail)
+            return None
+
+        self.__load_placement_counts_from_base()
+        if not self._pending_match_data:
+            self.save_snapshot()
+        return None
+
+    def __is_snapshot_usable(self) -> bool:
+        if not self._snapshot.exists:
+            return False
+        _, metadata = self._snapshot.load()
+        return (metadata.get("number_of_teams") == self.number_of_teams() and
+                all(champion_name in self.champion_registry.ids for champion_name in metadata.get("champion_names", [None])) and
+                metadata.get("match_log_offset", -1) <= self._match_log.end_offset())
+
+    def __load_placement_counts_from_base(self) -> None:
+        # The base CSV is sorted by name, the counts follow the registry ids, so rows and columns are matched by name.
+        base_data = self._load_base()
+        champion_names = list(self.champion_registry.names)
+        number_of_champions = len(champion_names)
+        base_counts = base_data.reindex(index=champion_names, columns=self.placement_column_names,
+                                        fill_value=0).to_numpy(dtype=np.int64)
+        self.__set_placement_counts(champion_names, base_counts.reshape(number_of_champions, number_of_champions,
+                                                                        self.number_of_teams()))
+        match_log = self._match_log.load()
+        self.__count_placements(match_log + self._pending_match_data)
+        self.__number_of_matches_since_snapshot = len(match_log)
+        return None
+
+    def __set_placement_counts(self, champion_names: list[str], placement_counts: np.ndarray) -> None:
+        # Counts saved under an older registry are moved to the current ids by name. Usually the registry has only
+        # grown since, so the saved champions are its first ids and a plain copy does.
+        number_of_champions = len(champion_names)
+        self.__placement_capacity = np.zeros((len(self.champion_registry), len(self.champion_registry),
+                                              self.number_of_teams()), dtype=np.int64)
+        if champion_names == self.champion_registry.names[:number_of_champions]:
+            self.__placement_capacity[:number_of_champions, :number_of_champions] = placement_counts
+        else:
+            champion_ids = [self.champion_registry.ids[champion_name] for champion_name in champion_names]
+            self.__placement_capacity[np.ix_(champion_ids, champion_ids)] = placement_counts
+        self.__placement_counts = self.__placement_capacity
+        self.__champion_ids = {champion_name: i for i, champion_name in enumerate(self.champion_registry.names)}
+        return None
+
+    def _register_champion(self, champion_name: str, riot_champion_id: int = None) -> int:
+        champion_id = super(ChampPlacementWriter, self)._register_champion(champion_name, riot_champion_id)
+        if self.__placement_counts is not None and champion_id >= self.__placement_counts.shape[0]:
+            self.__grow_placement_counts(champion_id + 1)
+            self.__champion_ids[self.champion_registry.names[champion_id]] = champion_id
+        return champion_id
+
+    def __grow_placement_counts(self, number_of_champions: int) -> None:
+        # Capacity doubles, so registering champions one at a time costs amortised O(1) copies of the counts.
+        capacity = self.__placement_capacity.shape[0]
+        if number_of_champions > capacity:
+            previous_number_of_champions = self.__placement_counts.shape[0]
+            self.__placement_capacity = np.zeros((max(number_of_champions, 2 * capacity),) * 2 + (self.number_of_teams(),),
+                                                 dtype=np.int64)
+            self.__placement_capacity[:previous_number_of_champions, :previous_number_of_champions] = self.__placement_counts
+        self.__placement_counts = self.__placement_capacity[:number_of_champions, :number_of_champions]
+        return None
+
+    def __count_placements(self, match_data: list[dict]) -> None:
+        try:
+            match_batch = MatchBatch.from_match_data(match_data, self.champion_registry.ids, self.number_of_teams())
+        except KeyError as e:
+            if not self.auto_register_new_champions:
+                raise KeyError(f"The champion {e} has no placement data in \'{self.file_path}\'") from e
+            # Only reached when the log names champions the registry has lost, e.g. a registry from another machine.
+            for data in match_data:
+                for champion_name in (champion_name for team in data["teams"] for champion_name in team):
+                    if champion_name not in self.champion_registry.ids:
+                        self._register_champion(champion_name)
+            match_batch = MatchBatch.from_match_data(match_data, self.champion_registry.ids, self.number_of_teams())
+        match_batch.add_placement_counts(self.__placement_counts)
+        return None
+
+    def __load_recorded_game_ids(self, recorded_game_index_file_path: str) -> RecordedGameIndex:
+        recorded_game_ids = RecordedGameIndex(recorded_game_index_file_path)
+        match_log_offset = 0
+        if not recorded_game_ids.exists:
+            # Migrate from the legacy format, where every recorded game id is a column of the recorded games CSV.
+            if self._recorded_games_reader.exists:
+                recorded_game_ids.update(self._recorded_games_reader.load().columns.tolist())
+        elif self.__is_snapshot_usable():
+            match_log_offset = self._snapshot.load()[1]["match_log_offset"]
+
+        # A crash between appending to the match log and to the index leaves ids that are only in the log tail.
+        recorded_game_ids.update(record["game_id"] for record in self._match_log.iter_records(match_log_offset))
+        recorded_game_ids.flush()
+        return recorded_game_ids
+
     @property
-    def champion_names(self) -> pd.DataFrame:
-        return self.__champ_names_file_reader.champion_names
+    def placement_column_names(self) -> list[str]:
+        # Only rebuilt when a champion is registered, rather than formatting every label on each call.
+        if len(self.__placement_column_names) != len(self.champion_registry) * self.number_of_teams():
+            self.__placement_column_names = [f"{champion_name}_{i}" for champion_name in self.champion_registry.names
+                                             for i in range(1, self.number_of_teams() + 1)]
+        return self.__placement_column_names
 
     @property
     def champion_names_with_placements(self) -> pd.DataFrame:
-        return self.__champ_names_file_reader.champion_names_with_placements
+        return pd.DataFrame(columns=self.placement_column_names)
 
-    def make_empty(self) -> None:
-        user_confirmation = input(f"Are you sure you want to OVERWRITE the files: \'{self.file_path}\' and \'{self._recorded_games_file_path}\' empty? Y/N: ")
-        if user_confirmation.lower() != 'y':
-            print("Cancelling making empty.")
-            return None
+    @property
+    def _storage_description(self) -> str:
+        return f"the files: \'{self.file_path}\', \'{self._recorded_games_file_path}\' and \'{self._match_log_file_path}\'"
 
+    def _clear_storage(self) -> None:
         champion_names = self.champion_names
         champion_names_with_placements = self.champion_names_with_placements
-        column_names = ["champion_names"] + champion_names_with_placements.values.tolist()
+        column_names = ["champion_names"] + champion_names_with_placements.columns.tolist()
 
         num_entries = champion_names_with_placements.columns.size
         num_champions = champion_names.columns.size
 
-        non_column_data = np.zeros((num_champions, num_entries), dtype=np.int32)
+        non_column_data = np.zeros((num_champions, num_entries + 1), dtype=np.int32)
 
         empty_data = pd.DataFrame(non_column_data, columns=column_names, index=champion_names.columns)
         empty_data.to_csv(self.file_path)
 
         with open(self._recorded_games_file_path, 'w'):
             pass
-        print(f"Files: {self.file_path} and {self._recorded_games_file_path} have been reset to default empty.")
+        self._match_log.save([])
+        self._snapshot.delete()
+        self.__recorded_game_ids.clear()
+        self.__number_of_matches_since_snapshot = 0
+        self.__placement_counts = None
+        self.__champion_ids = None
         return None
 
     def add_new_champion(self, champion: Champion) -> None:
@@ -95,43 +278,35 @@ class ChampPlacementWriter(FileReader, ABC):
         return None
 
     def add_new_champion_name(self, champion: Champion) -> None:
-        champion_names = self.champion_names
-        champion_names.columns = champion_names.columns.str.lower()
-        champion_names_list = champion_names.columns.tolist()
-
+        champion_names_list = self.__champ_names_file_reader.champion_names.columns.tolist()
         if champion.name in champion_names_list:
             print(f"The champion: \'{champion.name}\' is already added!")
             return None
 
+        self._register_champion(champion.name, champion.riot_champion_id)
+        self.champion_registry.save_if_dirty()
         insort(champion_names_list, champion.name)
-
         champion_names = pd.DataFrame(columns=champion_names_list)
         self.__champ_names_file_reader.save_new_champion_names(champion_names)
         return None
 
     def add_new_champion_to_placements(self, champion: Champion) -> None:
-        placement_data = self.load()
-        insert_index = bisect(placement_data.columns.tolist(), f"{champion.name}_1")
-        zeroes = [0 for _ in range(placement_data.shape[0])]
-        for i in range(1, self.number_of_teams() + 1):
-            placement_data.insert(loc=insert_index + i - 1, column=f"{champion.name}_{i}",
-                                  value=zeroes.copy())
-        index_names = placement_data.index.tolist()
+        # The base CSV is left alone, a champion missing from it simply starts with zero placements.
+        self._register_champion(champion.name, champion.riot_champion_id)
+        self.champion_registry.save_if_dirty()
+        return None
 
-        insert_index = bisect(index_names, champion.name)
-        dataframe_above = placement_data.iloc[:insert_index, :]
-        dataframe_below = placement_data.iloc[insert_index:, :]
 
-        zeroes = [0 for _ in range(placement_data.shape[1])]
+def default_match_log_file_path(recorded_games_file_path: str) -> str:
+    return f"{os.path.splitext(recorded_games_file_path)[0]}.jsonl"
+
+
+def default_recorded_game_index_file_path(recorded_games_file_path: str) -> str:
+    return f"{os.path.splitext(recorded_games_file_path)[0]}.ids"
 
-        new_row = pd.DataFrame([zeroes], columns=placement_data.columns.tolist(), index=[champion.name])
-        placement_data = pd.concat((dataframe_above, new_row, dataframe_below))
-        placement_data.to_csv(self.file_path)
-        return None
 
-    @abstractmethod
-    def validate_configuration(self) -> None:
-        raise NotImplementedError
+def default_snapshot_file_path(placements_file_path: str) -> str:
+    return f"{os.path.splitext(placements_file_path)[0]}_snapshot.json"
 
 
 class ChampionNamesReader:
@@ -150,7 +325,10 @@ class ChampionNamesReader:
         return champion_names
 
     @property
-    def champion_names_with_placements(self, number_of_teams: int = 8) -> pd.DataFrame:
+    def champion_names_with_placements(self) -> pd.DataFrame:
+        return self.champion_names_with_placements_for(8)
+
+    def champion_names_with_placements_for(self, number_of_teams: int) -> pd.DataFrame:
         new_names = [f"{champion_name}_{i}" for champion_name in self.champion_names
                      for i in range(1, number_of_teams + 1)]
         return pd.DataFrame(columns=new_names)
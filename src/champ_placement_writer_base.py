@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.file_writers_library import FileReader
+from src.league_library import Champion, Match
+from src.champion_registry_library import ChampionRegistry
+from src.metrics_library import MetricsRegistry
+
+
+class BaseChampPlacementWriter(FileReader, ABC):
+    champion_names_file_path = "champion_names.csv"
+    # One registry per number of teams, since the modes can be crawled in one process and each registers its own new
+    # champions. The shared registry from before is only read, to seed ids that existing data already uses.
+    champion_registry_file_path = "champion_registry_team{number_of_teams}.json"
+    shared_champion_registry_file_path = "champion_registry.json"
+
+    # Saved matches are buffered and handed to the backend in batches, by count or by time since the last flush.
+    # Backends only decide how a flush persists the buffer, how the counts are read back and what a snapshot is.
+    def __init__(self, file_path: str):
+        super(BaseChampPlacementWriter, self).__init__(file_path)
+        self.champion_registry: ChampionRegistry = None
+        self.auto_register_new_champions = True
+        self.flush_every_number_of_matches = 1
+        self.flush_interval_seconds: float = None
+        self.metrics = MetricsRegistry()
+        self._pending_match_data: list[dict] = []
+        self._last_flush_time = time.monotonic()
+        self.__match_listeners: list[Callable[[dict], None]] = []
+
+    def __enter__(self) -> BaseChampPlacementWriter:
+        return self
+
+    @abstractmethod
+    def number_of_teams(self) -> int:
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def number_of_recorded_games(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_recorded(self, game_id: str) -> bool:
+        raise NotImplementedError
+
+    @property
+    def number_of_pending_matches(self) -> int:
+        return len(self._pending_match_data)
+
+    def configure_flushing(self, flush_every_number_of_matches: int = 1, flush_interval_seconds: float = None) -> None:
+        if flush_every_number_of_matches < 1:
+            raise ValueError(f"Cannot flush every \'{flush_every_number_of_matches}\' matches. It must be at least 1.")
+        self.flush_every_number_of_matches = flush_every_number_of_matches
+        self.flush_interval_seconds = flush_interval_seconds
+        return None
+
+    def add_match_listener(self, listener: Callable[[dict], None]) -> None:
+        self.__match_listeners.append(listener)
+        return None
+
+    def remove_match_listener(self, listener: Callable[[dict], None]) -> None:
+        self.__match_listeners.remove(listener)
+        return None
+
+    def save(self, match: Match) -> None:
+        game_id = match.game_id
+
+        if self.is_recorded(game_id):
+            print(f"GameId: {game_id} already recorded. Data is not saved.")
+            return None
+
+        champion_ids = self.champion_registry.ids
+        team_champion_names = [[self.__champion_name(champion) for champion in team.champions] for team in match.teams]
+        unknown_champion_names = {champion_name for champion_names in team_champion_names
+                                  for champion_name in champion_names if champion_name not in champion_ids}
+        if unknown_champion_names and not self.auto_register_new_champions:
+            raise KeyError(f"GameId: {game_id} contains champions with no placement data: {sorted(unknown_champion_names)}")
+        for team, champion_names in zip(match.teams, team_champion_names):
+            for champion, champion_name in zip(team.champions, champion_names):
+                if champion_name in unknown_champion_names:
+                    self._register_champion(champion_name, champion.riot_champion_id)
+                    print(f"Registered the new champion: \'{champion_name}\' from GameId: {game_id}")
+                elif champion.riot_champion_id is not None and champion.riot_champion_id not in self.champion_registry.riot_champion_ids:
+                    self.champion_registry.register(champion_name, champion.riot_champion_id)
+                elif champion.name not in champion_ids:
+                    self.champion_registry.add_alias(champion.name, champion_name)
+
+        match_data = match.data
+        match_data["teams"] = team_champion_names
+        self._add_pending_match_data(match_data)
+        for listener in self.__match_listeners:
+            listener(match_data)
+        self.flush_if_due()
+        return None
+
+    @abstractmethod
+    def _add_pending_match_data(self, match_data: dict) -> None:
+        raise NotImplementedError
+
+    def flush_if_due(self) -> None:
+        if not self._pending_match_data:
+            return None
+
+        if len(self._pending_match_data) >= self.flush_every_number_of_matches:
+            self.flush()
+            return None
+
+        if self.flush_interval_seconds is not None and time.monotonic() - self._last_flush_time >= self.flush_interval_seconds:
+            self.flush()
+        return None
+
+    @abstractmethod
+    def flush(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_snapshot(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def champion_ids(self) -> dict[str, int]:
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def placement_counts(self) -> np.ndarray:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_match_data(self) -> Iterator[dict]:
+        raise NotImplementedError
+
+    @property
+    def champion_names(self) -> pd.DataFrame:
+        return pd.DataFrame(columns=self.champion_registry.names)
+
+    def export_csv(self, file_path: str) -> None:
+        self.load().to_csv(file_path)
+        return None
+
+    def make_empty(self) -> None:
+        user_confirmation = input(f"Are you sure you want to OVERWRITE {self._storage_description} empty? Y/N: ")
+        if user_confirmation.lower() != 'y':
+            print("Cancelling making empty.")
+            return None
+
+        self._clear_storage()
+        self._pending_match_data = []
+        print(f"Reset {self._storage_description} to default empty.")
+        return None
+
+    @property
+    @abstractmethod
+    def _storage_description(self) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _clear_storage(self) -> None:
+        raise NotImplementedError
+
+    def _register_champion(self, champion_name: str, riot_champion_id: int = None) -> int:
+        is_new_champion = champion_name not in self.champion_registry
+        champion_id = self.champion_registry.register(champion_name, riot_champion_id)
+        if is_new_champion:
+            self.metrics.counter("placement_writer_champions_registered_total").increment()
+        return champion_id
+
+    @abstractmethod
+    def add_new_champion(self, champion: Champion) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def validate_configuration(self) -> None:
+        raise NotImplementedError
+
+    def __champion_name(self, champion: Champion) -> str:
+        # A champion Riot has renamed keeps its championId, so it is counted under the name it was registered with.
+        if champion.riot_champion_id not in self.champion_registry.riot_champion_ids:
+            return champion.name
+        return self.champion_registry.name_of(self.champion_registry.id_of_riot_champion(champion.riot_champion_id))
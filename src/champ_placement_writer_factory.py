@@ -1,6 +1,9 @@
+from __future__ import annotations
+
 from src.team4.league_stats_file_writers import ChampPlacementWriterTeam4
 from src.team8.league_stats_file_writers import ChampPlacementWriterTeam8
-from src.champ_placement_writer import ChampPlacementWriter
+from src.champ_placement_writer_base import BaseChampPlacementWriter
+from src.champ_placement_sqlite_writer import SQLiteChampPlacementWriter
 
 
 __valid_numbers_of_teams = frozenset((4, 8))
@@ -12,11 +15,15 @@ class InvalidTeamCountError(Exception):
         super().__init__(message)
 
 
-def champ_placement_writer_factory(number_of_teams: int, champion_placements_file_name: str, recorded_games_file_name: str) -> ChampPlacementWriter:
+def champ_placement_writer_factory(number_of_teams: int, champion_placements_file_name: str, recorded_games_file_name: str,
+                                   match_log_file_name: str = None,
+                                   database_file_name: str = None) -> BaseChampPlacementWriter:
     if number_of_teams not in __valid_numbers_of_teams:
         raise InvalidTeamCountError(number_of_teams)
+    if database_file_name is not None:
+        return SQLiteChampPlacementWriter(database_file_name, number_of_teams)
     if number_of_teams == 4:
-        return ChampPlacementWriterTeam4(champion_placements_file_name, recorded_games_file_name)
+        return ChampPlacementWriterTeam4(champion_placements_file_name, recorded_games_file_name, match_log_file_name)
     if number_of_teams == 8:
-        return ChampPlacementWriterTeam8(champion_placements_file_name, recorded_games_file_name)
+        return ChampPlacementWriterTeam8(champion_placements_file_name, recorded_games_file_name, match_log_file_name)
     raise TypeError
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+
+import matplotlib.image
+from matplotlib.offsetbox import OffsetImage
+import numpy as np
+
+from src.file_writers_library import NPY_FileReader
+
+
+CHAMPION_ICON_ATLAS_FILE_NAME = "champion_icon_atlas.json"
+
+
+def downscale_icon(icon: np.ndarray, zoom: float) -> (np.ndarray, float):
+    # Averages blocks of pixels down to roughly the displayed size, so matplotlib resamples a few hundred pixels per
+    # icon instead of the full image. Returns the icon and the zoom still left to apply to it.
+    factor = max(1, int(1 / zoom))
+    if factor == 1:
+        return icon, zoom
+    height = icon.shape[0] // factor * factor
+    width = icon.shape[1] // factor * factor
+    blocks = icon[:height, :width].reshape(height // factor, factor, width // factor, factor, *icon.shape[2:])
+    return blocks.mean(axis=(1, 3), dtype=np.float32), zoom * factor
+
+
+def resize_icon(icon: np.ndarray, icon_size: int) -> np.ndarray:
+    # Any decoded PNG to an (icon_size, icon_size, 4) RGBA uint8 array: block averaged most of the way down, then
+    # nearest pixel for whatever is left.
+    if icon.dtype != np.uint8:
+        icon = np.rint(np.clip(icon, 0, 1) * 255).astype(np.uint8)
+    if icon.ndim == 2:
+        icon = np.repeat(icon[:, :, np.newaxis], 3, axis=2)
+    if icon.shape[2] == 3:
+        icon = np.concatenate((icon, np.full(icon.shape[:2] + (1,), 255, dtype=np.uint8)), axis=2)
+
+    icon, _ = downscale_icon(icon, icon_size / min(icon.shape[:2]))
+    rows = np.arange(icon_size) * icon.shape[0] // icon_size
+    columns = np.arange(icon_size) * icon.shape[1] // icon_size
+    return np.rint(icon[np.ix_(rows, columns)]).astype(np.uint8)
+
+
+class ChampionIconAtlas:
+    # Every champion icon pre-resized into one (champions, size, size, RGBA) uint8 array, saved next to the icons and
+    # memory-mapped on load, so a report reads one small file instead of decoding a PNG per champion per plot.
+    def __init__(self, icons: np.ndarray, champion_names: list[str], zoom: float):
+        self.icons = icons
+        self.champion_names = champion_names
+        self.zoom = zoom
+        self.ids = {champion_name: champion_id for champion_id, champion_name in enumerate(champion_names)}
+
+    def __repr__(self) -> str:
+        return f"ChampionIconAtlas({len(self)} champions, {self.icon_size}px)"
+
+    def __len__(self) -> int:
+        return len(self.champion_names)
+
+    def __contains__(self, champion_name: str) -> bool:
+        return champion_name in self.ids
+
+    @property
+    def icon_size(self) -> int:
+        return self.icons.shape[1]
+
+    def icon(self, champion_name: str) -> np.ndarray | None:
+        champion_id = self.ids.get(champion_name)
+        if champion_id is None:
+            return None
+        return self.icons[champion_id]
+
+    @classmethod
+    def build(cls, champion_icons_dir_path: str, zoom: float = 0.2) -> ChampionIconAtlas:
+        champion_names = sorted(icon_champion_names(champion_icons_dir_path))
+        decoded_icons = [matplotlib.image.imread(f"{champion_icons_dir_path}/{champion_name}.png")
+                         for champion_name in champion_names]
+        icon_size = max(1, round(max((icon.shape[1] for icon in decoded_icons), default=1) * zoom))
+        icons = np.empty((len(champion_names), icon_size, icon_size, 4), dtype=np.uint8)
+        for champion_id, icon in enumerate(decoded_icons):
+            icons[champion_id] = resize_icon(icon, icon_size)
+        return cls(icons, champion_names, zoom)
+
+    @classmethod
+    def load_or_build(cls, champion_icons_dir_path: str, zoom: float = 0.2) -> ChampionIconAtlas:
+        # Rebuilt whenever an icon is added, removed or newer than the atlas, e.g. after the icon scraper has run again.
+        if not os.path.isdir(champion_icons_dir_path):
+            return cls(np.empty((0, 1, 1, 4), dtype=np.uint8), [], zoom)
+
+        atlas_reader = NPY_FileReader(os.path.join(champion_icons_dir_path, CHAMPION_ICON_ATLAS_FILE_NAME))
+        if atlas_reader.exists:
+            icons, metadata = atlas_reader.load()
+            if metadata["zoom"] == zoom and not is_atlas_stale(champion_icons_dir_path, metadata["champion_names"],
+                                                               os.path.getmtime(atlas_reader.file_path)):
+                return cls(icons, metadata["champion_names"], zoom)
+
+        atlas = cls.build(champion_icons_dir_path, zoom)
+        try:
+            atlas_reader.save(atlas.icons, {"champion_names": atlas.champion_names, "zoom": zoom})
+        except OSError:
+            pass  # A read only icons directory still gets the atlas, it is just rebuilt next time.
+        return atlas
+
+
+def icon_champion_names(champion_icons_dir_path: str) -> list[str]:
+    return [os.path.splitext(file_name)[0] for file_name in os.listdir(champion_icons_dir_path)
+            if file_name.endswith(".png")]
+
+
+def is_atlas_stale(champion_icons_dir_path: str, champion_names: list[str], atlas_modified_time: float) -> bool:
+    icon_names = icon_champion_names(champion_icons_dir_path)
+    if sorted(icon_names) != sorted(champion_names):
+        return True
+    return any(os.path.getmtime(f"{champion_icons_dir_path}/{champion_name}.png") > atlas_modified_time
+               for champion_name in icon_names)
+
+
+class ChampionIconCache:
+    # Champion icons from the champion_icons_web_scraper directory, served from the icon atlas, with any icon missing
+    # from it decoded and downscaled once and then reused by every plot.
+    def __init__(self, champion_icons_dir_path: str, zoom: float = 0.2):
+        self.champion_icons_dir_path = champion_icons_dir_path
+        self.zoom = zoom
+        self.__atlas: ChampionIconAtlas = None
+        self.__icons: dict[str, (np.ndarray, float)] = {}
+
+    def __repr__(self) -> str:
+        return f"ChampionIconCache(\'{self.champion_icons_dir_path}\', {self.atlas})"
+
+    @property
+    def atlas(self) -> ChampionIconAtlas:
+        if self.__atlas is None:
+            self.__atlas = ChampionIconAtlas.load_or_build(self.champion_icons_dir_path, self.zoom)
+        return self.__atlas
+
+    def icon(self, champion_name: str) -> (np.ndarray, float):
+        atlas_icon = self.atlas.icon(champion_name)
+        if atlas_icon is not None:
+            return atlas_icon, 1.0
+
+        icon_and_zoom = self.__icons.get(champion_name)
+        if icon_and_zoom is None:
+            icon = matplotlib.image.imread(f"{self.champion_icons_dir_path}/{champion_name}.png")
+            icon_and_zoom = downscale_icon(icon, self.zoom)
+            self.__icons[champion_name] = icon_and_zoom
+        return icon_and_zoom
+
+    def offset_image(self, champion_name: str) -> OffsetImage:
+        icon, zoom = self.icon(champion_name)
+        return OffsetImage(icon, zoom=zoom)
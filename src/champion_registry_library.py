@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+import os
+
+from src.file_writers_library import JSON_FileReader
+from src.league_library import normalise_champion_name
+
+
+DEFAULT_CHAMPION_ALIASES = {"nunu": "nunu&willump"}
+
+
+class UnknownChampionError(KeyError):
+    def __init__(self, champion_name: str):
+        message = f"The champion: \'{champion_name}\' is not in the champion registry."
+        super().__init__(message)
+
+
+class ChampionRegistry:
+    # Canonical champion names, their aliases and Riot championIds, mapped to dense integer ids. Ids are given out in
+    # registration order and never change, so they can index the placement arrays directly.
+    def __init__(self, file_path: str = "champion_registry.json"):
+        self.file_path = file_path
+        self.__reader = JSON_FileReader(file_path)
+        self.names: list[str] = []
+        self.ids: dict[str, int] = {}  # Canonical names and aliases.
+        self.riot_champion_ids: dict[int, int] = {}
+        self.__aliases: dict[str, str] = {}
+        self.__is_dirty = False
+        if self.__reader.exists:
+            self.__load()
+
+    def __repr__(self) -> str:
+        return f"ChampionRegistry(\'{self.file_path}\', {len(self)} champions)"
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, champion_name: str) -> bool:
+        return normalise_champion_name(champion_name) in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __getitem__(self, champion_name: str) -> int:
+        return self.id_of(champion_name)
+
+    @classmethod
+    def load_or_create(cls, file_path: str, champion_names: Iterable[str],
+                       seed_file_path: str = None) -> ChampionRegistry:
+        # The first run copies the registry at `seed_file_path` when there is one, so the ids it gave out are kept.
+        # Otherwise it is seeded from `champion_names`, so existing ids follow the champion names file.
+        registry = cls(file_path)
+        if registry.names:
+            return registry
+        if seed_file_path is not None and os.path.isfile(seed_file_path):
+            registry.__copy(cls(seed_file_path))
+        else:
+            registry.update(champion_names)
+            for alias, champion_name in DEFAULT_CHAMPION_ALIASES.items():
+                if champion_name in registry.ids:
+                    registry.add_alias(alias, champion_name)
+        registry.save()
+        return registry
+
+    @property
+    def is_dirty(self) -> bool:
+        return self.__is_dirty
+
+    def id_of(self, champion_name: str) -> int:
+        champion_id = self.ids.get(normalise_champion_name(champion_name))
+        if champion_id is None:
+            raise UnknownChampionError(champion_name)
+        return champion_id
+
+    def id_of_riot_champion(self, riot_champion_id: int) -> int:
+        champion_id = self.riot_champion_ids.get(riot_champion_id)
+        if champion_id is None:
+            raise UnknownChampionError(f"championId={riot_champion_id}")
+        return champion_id
+
+    def name_of(self, champion_id: int) -> str:
+        return self.names[champion_id]
+
+    def register(self, champion_name: str, riot_champion_id: int = None) -> int:
+        champion_name = normalise_champion_name(champion_name)
+        champion_id = self.ids.get(champion_name)
+        if champion_id is None:
+            champion_id = len(self.names)
+            self.names.append(champion_name)
+            self.ids[champion_name] = champion_id
+            self.__is_dirty = True
+        if riot_champion_id is not None and self.riot_champion_ids.get(riot_champion_id) != champion_id:
+            self.riot_champion_ids[riot_champion_id] = champion_id
+            self.__is_dirty = True
+        return champion_id
+
+    def update(self, champion_names: Iterable[str]) -> list[int]:
+        return [self.register(champion_name) for champion_name in champion_names]
+
+    def add_alias(self, alias: str, champion_name: str) -> None:
+        alias = alias.lower()
+        champion_id = self.id_of(champion_name)
+        if self.ids.get(alias) == champion_id:
+            return None
+        if alias in self.ids:
+            raise ValueError(f"The alias: \'{alias}\' already names the champion: \'{self.names[self.ids[alias]]}\'.")
+        self.ids[alias] = champion_id
+        self.__aliases[alias] = self.names[champion_id]
+        self.__is_dirty = True
+        return None
+
+    def save(self) -> None:
+        # Written to a temporary file first, so a crash never leaves a half written registry behind.
+        data = {"champions": self.names,
+                "aliases": self.__aliases,
+                "riot_champion_ids": {str(riot_champion_id): self.names[champion_id]
+                                      for riot_champion_id, champion_id in sorted(self.riot_champion_ids.items())}}
+        temporary_file_path = f"{self.file_path}.tmp"
+        JSON_FileReader(temporary_file_path).save(data)
+        os.replace(temporary_file_path, self.file_path)
+        self.__is_dirty = False
+        return None
+
+    def save_if_dirty(self) -> None:
+        if self.__is_dirty:
+            self.save()
+        return None
+
+    def __copy(self, registry: ChampionRegistry) -> None:
+        self.update(registry.names)
+        for alias, champion_name in registry.__aliases.items():
+            self.add_alias(alias, champion_name)
+        for riot_champion_id, champion_id in registry.riot_champion_ids.items():
+            self.register(registry.names[champion_id], riot_champion_id)
+        return None
+
+    def __load(self) -> None:
+        data = self.__reader.load()
+        self.names = list(data["champions"])
+        self.ids = {champion_name: champion_id for champion_id, champion_name in enumerate(self.names)}
+        for alias, champion_name in data.get("aliases", {}).items():
+            self.ids[alias] = self.ids[champion_name]
+            self.__aliases[alias] = champion_name
+        self.riot_champion_ids = {int(riot_champion_id): self.ids[champion_name]
+                                  for riot_champion_id, champion_name in data.get("riot_champion_ids", {}).items()}
+        return None
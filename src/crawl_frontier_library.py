@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+import heapq
+import sqlite3
+
+
+class BoundedPriorityBuffer:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.__heap: list[tuple[float, str]] = []
+        self.__priorities: dict[str, float] = {}
+        self.holds_all_pending = True
+
+    def __len__(self) -> int:
+        return len(self.__priorities)
+
+    def push(self, item_id: str, priority: float) -> None:
+        self.__priorities[item_id] = priority
+        heapq.heappush(self.__heap, (-priority, item_id))
+        if len(self.__priorities) > 2 * self.capacity:
+            self.__spill()
+        return None
+
+    def pop(self) -> str | None:
+        while self.__heap:
+            negative_priority, item_id = heapq.heappop(self.__heap)
+            if self.__priorities.get(item_id) == -negative_priority:
+                del self.__priorities[item_id]
+                return item_id
+        return None
+
+    def __spill(self) -> None:
+        # Only the best `capacity` entries stay in memory, the rest remain pending on disk until a refill.
+        kept = heapq.nlargest(self.capacity, ((priority, item_id) for item_id, priority in self.__priorities.items()))
+        self.__priorities = {item_id: priority for priority, item_id in kept}
+        self.__heap = [(-priority, item_id) for priority, item_id in kept]
+        heapq.heapify(self.__heap)
+        self.holds_all_pending = False
+        return None
+
+
+class CrawlFrontier:
+    PENDING = 0
+    IN_PROGRESS = 1
+    CHECKED = 2
+    # A match or player that keeps failing with server or rate limit errors is given up on after this many fetches.
+    MAX_FETCH_ATTEMPTS = 3
+    RETRY_PRIORITY_PENALTY = 1.0
+
+    def __init__(self, file_path: str, memory_budget: int = 10_000):
+        self.file_path = file_path
+        self.memory_budget = memory_budget
+        self.__connection = sqlite3.connect(file_path)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__create_tables()
+        self.__reclaim_in_progress()
+
+        self.__buffers = {"players": BoundedPriorityBuffer(memory_budget), "matches": BoundedPriorityBuffer(memory_budget)}
+        for buffer in self.__buffers.values():
+            buffer.holds_all_pending = False
+
+    def __enter__(self) -> CrawlFrontier:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+        return None
+
+    def __create_tables(self) -> None:
+        with self.__connection:
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS players ("
+                                      "puuid TEXT PRIMARY KEY, "
+                                      "state INTEGER NOT NULL DEFAULT 0, "
+                                      "priority REAL NOT NULL DEFAULT 0, "
+                                      "failed_attempts INTEGER NOT NULL DEFAULT 0)")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS matches ("
+                                      "match_id TEXT PRIMARY KEY, "
+                                      "state INTEGER NOT NULL DEFAULT 0, "
+                                      "is_valid INTEGER, "
+                                      "priority REAL NOT NULL DEFAULT 0, "
+                                      "failed_attempts INTEGER NOT NULL DEFAULT 0)")
+            for table_name in ("players", "matches"):
+                column_names = {row[1] for row in self.__connection.execute(f"PRAGMA table_info({table_name})")}
+                if "priority" not in column_names:
+                    self.__connection.execute(f"ALTER TABLE {table_name} ADD COLUMN priority REAL NOT NULL DEFAULT 0")
+                if "failed_attempts" not in column_names:
+                    self.__connection.execute(f"ALTER TABLE {table_name} ADD COLUMN failed_attempts INTEGER NOT NULL DEFAULT 0")
+                self.__connection.execute(f"CREATE INDEX IF NOT EXISTS {table_name}_state_priority "
+                                          f"ON {table_name} (state, priority DESC)")
+        return None
+
+    def __reclaim_in_progress(self) -> None:
+        # Requests that were in flight when the last run stopped never had their results recorded.
+        with self.__connection:
+            self.__connection.execute("UPDATE players SET state = ? WHERE state = ?", (self.PENDING, self.IN_PROGRESS))
+            self.__connection.execute("UPDATE matches SET state = ? WHERE state = ?", (self.PENDING, self.IN_PROGRESS))
+        return None
+
+    def commit(self) -> None:
+        self.__connection.commit()
+        return None
+
+    def close(self) -> None:
+        self.__connection.commit()
+        self.__connection.close()
+        return None
+
+    def add_players(self, puuids: Iterable[str], priority: float = 0.0) -> int:
+        return self.__add("players", "puuid", [(puuid, priority) for puuid in puuids])
+
+    def add_matches(self, match_ids: Iterable[str], priorities: Iterable[float] = None) -> int:
+        match_ids = list(match_ids)
+        if priorities is None:
+            priorities = [0.0] * len(match_ids)
+        return self.__add("matches", "match_id", list(zip(match_ids, priorities)))
+
+    def __add(self, table_name: str, id_column_name: str, ids_with_priority: list[tuple[str, float]]) -> int:
+        # Seeing a pending id again adds to its priority, checked and in progress ids are left alone.
+        if not ids_with_priority:
+            return 0
+        cursor = self.__connection.executemany(f"INSERT OR IGNORE INTO {table_name} ({id_column_name}) VALUES (?)",
+                                               ((item_id,) for item_id, _ in ids_with_priority))
+        number_of_new_ids = cursor.rowcount
+        self.__connection.executemany(f"UPDATE {table_name} SET priority = priority + ? "
+                                      f"WHERE {id_column_name} = ? AND state = {self.PENDING}",
+                                      ((priority, item_id) for item_id, priority in ids_with_priority))
+
+        placeholders = ','.join('?' * len(ids_with_priority))
+        rows = self.__connection.execute(f"SELECT {id_column_name}, priority FROM {table_name} "
+                                         f"WHERE {id_column_name} IN ({placeholders}) AND state = {self.PENDING}",
+                                         [item_id for item_id, _ in ids_with_priority])
+        buffer = self.__buffers[table_name]
+        for item_id, priority in rows:
+            buffer.push(item_id, priority)
+        return number_of_new_ids
+
+    def pop_player(self) -> str | None:
+        return self.__pop("players", "puuid")
+
+    def pop_match(self) -> str | None:
+        return self.__pop("matches", "match_id")
+
+    def __pop(self, table_name: str, id_column_name: str) -> str | None:
+        buffer = self.__buffers[table_name]
+        if len(buffer) == 0 and not buffer.holds_all_pending:
+            self.__refill(table_name, id_column_name)
+
+        item_id = buffer.pop()
+        if item_id is None:
+            return None
+        self.__connection.execute(f"UPDATE {table_name} SET state = ? WHERE {id_column_name} = ?",
+                                  (self.IN_PROGRESS, item_id))
+        return item_id
+
+    def __refill(self, table_name: str, id_column_name: str) -> None:
+        buffer = self.__buffers[table_name]
+        rows = self.__connection.execute(f"SELECT {id_column_name}, priority FROM {table_name} WHERE state = ? "
+                                         f"ORDER BY priority DESC LIMIT ?", (self.PENDING, buffer.capacity)).fetchall()
+        for item_id, priority in rows:
+            buffer.push(item_id, priority)
+        buffer.holds_all_pending = len(rows) < buffer.capacity
+        return None
+
+    def player_priority(self, puuid: str) -> float:
+        row = self.__connection.execute("SELECT priority FROM players WHERE puuid = ?", (puuid,)).fetchone()
+        return 0.0 if row is None else row[0]
+
+    def mark_player_checked(self, puuid: str) -> None:
+        self.__connection.execute("UPDATE players SET state = ? WHERE puuid = ?", (self.CHECKED, puuid))
+        return None
+
+    def mark_match_checked(self, match_id: str, is_valid: bool) -> None:
+        self.__connection.execute("UPDATE matches SET state = ?, is_valid = ? WHERE match_id = ?",
+                                  (self.CHECKED, int(is_valid), match_id))
+        return None
+
+    def retry_player(self, puuid: str) -> bool:
+        is_retried = self.__retry("players", "puuid", puuid)
+        if not is_retried:
+            self.mark_player_checked(puuid)
+        return is_retried
+
+    def retry_match(self, match_id: str) -> bool:
+        is_retried = self.__retry("matches", "match_id", match_id)
+        if not is_retried:
+            self.mark_match_checked(match_id, False)
+        return is_retried
+
+    def __retry(self, table_name: str, id_column_name: str, item_id: str) -> bool:
+        # After a transient fetch error the id goes back to pending behind the others, unless it has run out of
+        # attempts, in which case the caller checks it. Returns whether it will be fetched again.
+        self.__connection.execute(f"UPDATE {table_name} SET failed_attempts = failed_attempts + 1, priority = priority - ? "
+                                  f"WHERE {id_column_name} = ?", (self.RETRY_PRIORITY_PENALTY, item_id))
+        row = self.__connection.execute(f"SELECT failed_attempts, priority FROM {table_name} WHERE {id_column_name} = ?",
+                                        (item_id,)).fetchone()
+        if row is None or row[0] >= self.MAX_FETCH_ATTEMPTS:
+            return False
+        self.__connection.execute(f"UPDATE {table_name} SET state = ? WHERE {id_column_name} = ?", (self.PENDING, item_id))
+        self.__buffers[table_name].push(item_id, row[1])
+        return True
+
+    @property
+    def number_of_pending_players(self) -> int:
+        return self.__count("players", self.PENDING)
+
+    @property
+    def number_of_pending_matches(self) -> int:
+        return self.__count("matches", self.PENDING)
+
+    @property
+    def number_of_checked_players(self) -> int:
+        return self.__count("players", self.CHECKED)
+
+    @property
+    def number_of_checked_matches(self) -> int:
+        return self.__count("matches", self.CHECKED)
+
+    @property
+    def has_pending(self) -> bool:
+        return self.number_of_pending_players > 0 or self.number_of_pending_matches > 0
+
+    def __count(self, table_name: str, state: int) -> int:
+        return self.__connection.execute(f"SELECT COUNT(*) FROM {table_name} WHERE state = ?", (state,)).fetchone()[0]
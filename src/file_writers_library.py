@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 import json
 import os
+import numpy as np
 import pandas as pd
 
 
@@ -66,3 +67,134 @@ class CSV_FileReader(FileReader):
         if os.stat(self.file_path).st_size == 0:
             return pd.DataFrame()
         return pd.read_csv(self.file_path, sep=',', index_col=index_column)
+
+
+class TextLines_FileReader(FileReader):
+    def __init__(self, file_path: str):
+        super(TextLines_FileReader, self).__init__(file_path)
+        self.__is_tail_checked = False
+
+    def save(self, data: list) -> None:
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.writelines(self._encode(record) for record in data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.__is_tail_checked = True
+        return None
+
+    def append(self, data: list) -> None:
+        if not data:
+            return None
+        if not self.__is_tail_checked:
+            self.__truncate_torn_tail()
+        with open(self.file_path, 'a', encoding='utf-8') as f:
+            f.writelines(self._encode(record) for record in data)
+            f.flush()
+            os.fsync(f.fileno())
+        return None
+
+    def load(self) -> list:
+        return list(self.iter_records())
+
+    def iter_records(self, offset: int = 0):
+        if not self.exists:
+            return
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # A torn final line from an interrupted append is never counted.
+                yield self._decode(line)
+
+    def end_offset(self) -> int:
+        if not self.exists:
+            return 0
+        if not self.__is_tail_checked:
+            self.__truncate_torn_tail()
+        return os.path.getsize(self.file_path)
+
+    def __truncate_torn_tail(self) -> None:
+        self.__is_tail_checked = True
+        if not self.exists or self.is_empty:
+            return None
+        with open(self.file_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b'\n':
+                return None
+            f.seek(0)
+            content = f.read()
+            f.truncate(content.rfind(b'\n') + 1)
+        return None
+
+    @staticmethod
+    def _encode(record: str) -> str:
+        return f"{record}\n"
+
+    @staticmethod
+    def _decode(line: bytes) -> str:
+        return line[:-1].decode('utf-8')
+
+
+class JSONLines_FileReader(TextLines_FileReader):
+    def __init__(self, file_path: str):
+        super(JSONLines_FileReader, self).__init__(file_path)
+
+    @staticmethod
+    def _encode(record: dict) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    @staticmethod
+    def _decode(line: bytes) -> dict:
+        return json.loads(line)
+
+
+class NPY_FileReader(FileReader):
+    # `file_path` is a small JSON index naming the current .npy file, so replacing the index swaps both atomically.
+    def __init__(self, file_path: str):
+        super(NPY_FileReader, self).__init__(file_path)
+
+    def __load_index(self) -> dict:
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, data: np.ndarray, metadata: dict = None) -> None:
+        previous_array_file_path = None
+        version = 0
+        if self.exists:
+            previous_index = self.__load_index()
+            previous_array_file_path = self.__array_file_path(previous_index)
+            version = previous_index["version"] + 1
+
+        array_file_name = f"{os.path.splitext(os.path.basename(self.file_path))[0]}.{version}.npy"
+        index = {"version": version, "array_file_name": array_file_name, "metadata": metadata if metadata is not None else {}}
+        with open(self.__array_file_path(index), 'wb') as f:
+            np.save(f, np.ascontiguousarray(data))
+            f.flush()
+            os.fsync(f.fileno())
+
+        temporary_file_path = f"{self.file_path}.tmp"
+        with open(temporary_file_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_file_path, self.file_path)
+
+        if previous_array_file_path is not None and os.path.isfile(previous_array_file_path):
+            os.remove(previous_array_file_path)
+        return None
+
+    def load(self) -> tuple[np.ndarray, dict]:
+        index = self.__load_index()
+        return np.load(self.__array_file_path(index), mmap_mode='r'), index["metadata"]
+
+    def delete(self) -> None:
+        if not self.exists:
+            return None
+        array_file_path = self.__array_file_path(self.__load_index())
+        os.remove(self.file_path)
+        if os.path.isfile(array_file_path):
+            os.remove(array_file_path)
+        return None
+
+    def __array_file_path(self, index: dict) -> str:
+        return os.path.join(os.path.dirname(self.file_path), index["array_file_name"])
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections.abc import Callable
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.league_library import Champion
+
+
+def triangular_pair_id(champion1_id: int, champion2_id: int) -> int:
+    # Pair ids for champion1 < champion2 that do not depend on the number of champions, so registering a new
+    # champion only appends new pair ids.
+    champion1_id, champion2_id = min(champion1_id, champion2_id), max(champion1_id, champion2_id)
+    return champion2_id * (champion2_id - 1) // 2 + champion1_id
+
+
+def champion_ids_of_pair(pair_id: int) -> tuple[int, int]:
+    champion2_id = (1 + math.isqrt(1 + 8 * pair_id)) // 2
+    return pair_id - champion2_id * (champion2_id - 1) // 2, champion2_id
+
+
+class RankedAverages:
+    # Entries are ordered by (average placement, most samples first, entry order), the same order as
+    # PairwiseChampionData. The entry order is the id itself unless `entry_order` maps ids to something else.
+    def __init__(self, placement_sums: np.ndarray, sample_sizes: np.ndarray, entry_order: Callable[[int], object] = None):
+        self.placement_sums = np.array(placement_sums, dtype=np.int64)
+        self.sample_sizes = np.array(sample_sizes, dtype=np.int64)
+        self.__entry_order = entry_order
+        self.__ranking = sorted(self.__key(entry_id) for entry_id in np.flatnonzero(self.sample_sizes).tolist())
+
+    def __len__(self) -> int:
+        return len(self.__ranking)
+
+    def __key(self, entry_id: int) -> tuple[float, int, object, int]:
+        sample_size = int(self.sample_sizes[entry_id])
+        entry_order = entry_id if self.__entry_order is None else self.__entry_order(entry_id)
+        return int(self.placement_sums[entry_id]) / sample_size, -sample_size, entry_order, entry_id
+
+    def reserve(self, number_of_entries: int) -> None:
+        # Capacity doubles, so growing one entry at a time is amortised constant time.
+        capacity = self.sample_sizes.size
+        if number_of_entries <= capacity:
+            return None
+        padding = np.zeros(max(number_of_entries, 2 * capacity) - capacity, dtype=np.int64)
+        self.placement_sums = np.concatenate((self.placement_sums, padding))
+        self.sample_sizes = np.concatenate((self.sample_sizes, padding))
+        return None
+
+    def average(self, entry_id: int) -> float:
+        if self.sample_sizes[entry_id] == 0:
+            return 0.0
+        return self.__key(entry_id)[0]
+
+    def add_placement(self, entry_id: int, placement: int) -> None:
+        # Only the updated entry moves, the rest of the ranking is untouched.
+        if self.sample_sizes[entry_id] > 0:
+            del self.__ranking[bisect_left(self.__ranking, self.__key(entry_id))]
+        self.sample_sizes[entry_id] += 1
+        self.placement_sums[entry_id] += placement
+        insort(self.__ranking, self.__key(entry_id))
+        return None
+
+    def top(self, k: int, minimum_sample_size: int = 1) -> list[tuple[float, int, int]]:
+        if minimum_sample_size <= 1:
+            return [(average, -negative_sample_size, entry_id) for average, negative_sample_size, _, entry_id in self.__ranking[:k]]
+        best = []
+        for average, negative_sample_size, _, entry_id in self.__ranking:
+            if len(best) >= k:
+                break
+            if -negative_sample_size >= minimum_sample_size:
+                best.append((average, -negative_sample_size, entry_id))
+        return best
+
+
+class IncrementalChampionStats:
+    def __init__(self, champion_names: list[str], placements: np.ndarray, team_count: int = 4):
+        self.champion_names = pd.Index(champion_names)
+        self.team_count = team_count
+        self.__champion_ids = {champion_name: i for i, champion_name in enumerate(champion_names)}
+        number_of_champions = len(champion_names)
+
+        placement_weights = np.arange(1, team_count + 1)
+        champion_placements = placements.sum(axis=1)
+        self.__champions = RankedAverages(champion_placements @ placement_weights, champion_placements.sum(axis=-1))
+
+        # Each pair champion1 < champion2 is stored once, at its triangular pair id.
+        champion1_ids, champion2_ids = np.triu_indices(number_of_champions, k=1)
+        pair_ids = champion2_ids * (champion2_ids - 1) // 2 + champion1_ids
+        pair_placements = np.zeros((number_of_champions * (number_of_champions - 1) // 2, team_count), dtype=np.int64)
+        pair_placements[pair_ids] = placements[champion1_ids, champion2_ids]
+        self.__pairs = RankedAverages(pair_placements @ placement_weights, pair_placements.sum(axis=-1),
+                                      entry_order=champion_ids_of_pair)
+
+    def add_champion(self, champion_name: str) -> int:
+        # Champions first seen in a new match are appended, in the same order the placement writer registers them.
+        champion_id = self.__champion_ids.get(champion_name)
+        if champion_id is not None:
+            return champion_id
+        champion_id = len(self.champion_names)
+        self.__champion_ids[champion_name] = champion_id
+        self.champion_names = self.champion_names.append(pd.Index([champion_name]))
+        self.__champions.reserve(champion_id + 1)
+        self.__pairs.reserve(triangular_pair_id(champion_id - 1, champion_id) + 1)
+        return champion_id
+
+    def add_match(self, match_data: dict) -> None:
+        for (champion1, champion2), placement in zip(match_data["teams"], match_data["scoreboard"]):
+            champion1_id = self.__champion_ids.get(champion1)
+            if champion1_id is None:
+                champion1_id = self.add_champion(champion1)
+            champion2_id = self.__champion_ids.get(champion2)
+            if champion2_id is None:
+                champion2_id = self.add_champion(champion2)
+            self.__champions.add_placement(champion1_id, placement)
+            self.__champions.add_placement(champion2_id, placement)
+            self.__pairs.add_placement(triangular_pair_id(champion1_id, champion2_id), placement)
+        return None
+
+    def total_samples(self) -> int:
+        return int(self.__champions.sample_sizes.sum()) // (self.team_count * 2)
+
+    def average_placement(self, champion: Champion) -> float:
+        return self.__champions.average(self.__champion_ids[champion.name])
+
+    def average_pairwise_placement(self, champion1: Champion, champion2: Champion) -> float:
+        return self.__pairs.average(triangular_pair_id(self.__champion_ids[champion1.name], self.__champion_ids[champion2.name]))
+
+    def best_champs(self, max_display_number_of_teammates: int = 10, minimum_sample_size: int = 1) -> pd.DataFrame:
+        best = self.__champions.top(max_display_number_of_teammates, minimum_sample_size)
+        return pd.DataFrame([[average for average, _, _ in best], [sample_size for _, sample_size, _ in best]],
+                            columns=[self.champion_names[champion_id] for _, _, champion_id in best],
+                            index=["Average placement", "Sample size (n)"])
+
+    def best_pairs(self, max_display_number_of_pairs: int = 10, minimum_sample_size: int = 1) -> pd.DataFrame:
+        best = self.__pairs.top(max_display_number_of_pairs, minimum_sample_size)
+        pairwise_champion_names = []
+        for _, _, pair_id in best:
+            champion1_id, champion2_id = champion_ids_of_pair(pair_id)
+            pairwise_champion_names.append(f"{self.champion_names[champion1_id]} + {self.champion_names[champion2_id]}")
+        return pd.DataFrame([[average for average, _, _ in best], [sample_size for _, sample_size, _ in best]],
+                            columns=pairwise_champion_names,
+                            index=["Average placement", "Sample size (n)"])
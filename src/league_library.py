@@ -1,15 +1,46 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+import sys
+
+import numpy as np
+
+
 class InvalidNumberOfParticipantsError(Exception):
     def __init__(self, number_of_players: int):
         message = f"An arena match must have 2 players per team, so cannot have {number_of_players}"
         super().__init__(message)
 
 
+class InvalidTeamSizeError(Exception):
+    def __init__(self, game_id: str, team_id: int, number_of_players: int):
+        message = f"GameId: {game_id} has {number_of_players} players in team {team_id}, an arena team must have 2."
+        super().__init__(message)
+
+
+# Raw Riot champion names seen so far, mapped to their normalised and interned name.
+normalised_champion_names: dict[str, str] = {}
+
+
+def normalise_champion_name(name: str) -> str:
+    normalised_name = normalised_champion_names.get(name)
+    if normalised_name is not None:
+        return normalised_name
+
+    normalised_name = name.lower()
+    if normalised_name == "nunu":
+        normalised_name = "nunu&willump"  # The RIOT backend is bugged, they use 2 names for Nunu.
+    normalised_name = sys.intern(normalised_name)
+    normalised_champion_names[name] = normalised_name
+    return normalised_name
+
+
 class Champion:
-    def __init__(self, name: str):
-        name_lower = name.lower()
-        self.name = name_lower
-        if name_lower == "nunu":
-            self.name = "nunu&willump"  # The RIOT backend is bugged, they use 2 names for Nunu.
+    __slots__ = ("name", "riot_champion_id")
+
+    def __init__(self, name: str, riot_champion_id: int = None):
+        self.name = normalise_champion_name(name)
+        self.riot_champion_id = riot_champion_id
 
     def __repr__(self):
         return self.name
@@ -20,12 +51,14 @@ class Champion:
 
 
 class Team:
+    __slots__ = ("champions",)
+
     def __init__(self, *champions: Champion):
         assert len(champions) == 2, TypeError
-        self.champions: list[Champion] = [*champions]
+        self.champions: tuple[Champion, ...] = champions
 
     def __repr__(self):
-        return str(self.champions)
+        return str(list(self.champions))
 
     @property
     def data(self) -> dict:
@@ -33,50 +66,105 @@ class Team:
 
 
 class Match:
+    __slots__ = ("teams", "scoreboard", "game_id")
+
     def __init__(self, teams: list[Team], scoreboard: list, game_id: str):
-        self.__match_info = self.__generate_match_info(teams, scoreboard, game_id)
         self.teams = teams
         self.scoreboard = scoreboard
         self.game_id = game_id
 
     def __repr__(self) -> str:
-        return f"Match({self.teams}, {self.scoreboard}, {self.game_id})"
+        return f"Match({list(self.teams)}, {self.scoreboard}, {self.game_id})"
 
-    @staticmethod
-    def __generate_match_info(teams: list[Team], scoreboard: list, game_id: str) -> dict:
-        info_dict = {f"team{i + 1}": team.data for i, team in enumerate(teams)}
-        info_dict["scoreboard"] = scoreboard
-        return {game_id: info_dict}
+    @property
+    def data(self) -> dict:
+        return {"game_id": self.game_id,
+                "teams": [[champion.name for champion in team.champions] for team in self.teams],
+                "scoreboard": list(self.scoreboard)}
 
     @classmethod
-    def from_game_data(cls, game_data: dict):
-        new_match = cls.__new__(cls)
+    def from_data(cls, data: dict) -> Match:
+        teams = [Team(*(Champion(champion_name) for champion_name in champion_names))
+                 for champion_names in data["teams"]]
+        return cls(teams, data["scoreboard"], data["game_id"])
 
-        participants = list(game_data["info"]["participants"])
+    @classmethod
+    def from_game_data(cls, game_data: dict) -> Match:
+        game_id = game_data["metadata"]["matchId"]
+        participants = game_data["info"]["participants"]
         number_of_players = len(participants)
         if number_of_players & 1:
-            raise InvalidNumberOfParticipantsError
+            raise InvalidNumberOfParticipantsError(number_of_players)
 
         number_of_teams = number_of_players // 2
         champions = [[] for _ in range(number_of_teams)]
-        scoreboard = [-1 for _ in range(number_of_players)]
+        scoreboard = [-1] * number_of_teams
         for player in participants:
-            champions[player["playerSubteamId"] - 1].append(Champion(player["championName"]))
-            scoreboard[player["playerSubteamId"] * 2 - 2] = player["placement"]
-            scoreboard[player["playerSubteamId"] * 2 - 1] = player["placement"]
-
-        try:
-            teams = tuple(Team(champions[i][0], champions[i][1]) for i in range(number_of_teams))
-        except IndexError as e:
-            print(e)
-            print(champions)
-            print(number_of_teams)
-            print(game_data)
-            raise e
-        game_id = game_data["metadata"]["matchId"]
+            team_index = player["playerSubteamId"] - 1
+            champions[team_index].append(Champion(player["championName"], player.get("championId")))
+            scoreboard[team_index] = player["placement"]
+
+        for team_index, team_champions in enumerate(champions):
+            if len(team_champions) != 2:
+                raise InvalidTeamSizeError(game_id, team_index + 1, len(team_champions))
+        return cls(tuple(Team(*team_champions) for team_champions in champions), scoreboard, game_id)
+
+
+class MatchBatch:
+    __slots__ = ("game_ids", "champion_ids", "placements")
+
+    # Many matches as arrays: champion_ids[m, t] holds the two champion ids of team t in match m, and
+    # placements[m, t] its placement. Champion ids index whatever champion name ordering the caller passes in.
+    def __init__(self, game_ids: list[str], champion_ids: np.ndarray, placements: np.ndarray):
+        self.game_ids = game_ids
+        self.champion_ids = champion_ids
+        self.placements = placements
 
-        new_match.teams = teams
-        new_match.scoreboard = scoreboard[::2]
-        new_match.game_id = game_id
-        new_match.__match_info = cls.__generate_match_info(teams, scoreboard, game_id)
-        return new_match
+    def __repr__(self) -> str:
+        return f"MatchBatch({len(self.game_ids)} matches, {self.number_of_teams} teams)"
+
+    def __len__(self) -> int:
+        return len(self.game_ids)
+
+    @property
+    def number_of_teams(self) -> int:
+        return self.placements.shape[1]
+
+    @classmethod
+    def from_match_data(cls, match_data: Iterable[dict], champion_ids: dict[str, int], number_of_teams: int) -> MatchBatch:
+        game_ids = []
+        flat_champion_ids = []
+        flat_placements = []
+        for data in match_data:
+            game_ids.append(data["game_id"])
+            for champion1, champion2 in data["teams"]:
+                flat_champion_ids += (champion_ids[champion1], champion_ids[champion2])
+            flat_placements += data["scoreboard"]
+        return cls.__from_lists(game_ids, flat_champion_ids, flat_placements, number_of_teams)
+
+    @classmethod
+    def __from_lists(cls, game_ids: list[str], flat_champion_ids: list[int], flat_placements: list[int],
+                     number_of_teams: int) -> MatchBatch:
+        champion_ids = np.array(flat_champion_ids, dtype=np.int32).reshape(len(game_ids), number_of_teams, 2)
+        placements = np.array(flat_placements, dtype=np.int8).reshape(len(game_ids), number_of_teams)
+        return cls(game_ids, champion_ids, placements)
+
+    def placement_count_indices(self) -> (np.ndarray, np.ndarray, np.ndarray):
+        # Indices into a (champion, teammate, placement) counts tensor, one entry per champion per team.
+        champion1_ids = self.champion_ids[:, :, 0].ravel()
+        champion2_ids = self.champion_ids[:, :, 1].ravel()
+        placement_indices = self.placements.ravel().astype(np.intp) - 1
+        return (np.concatenate((champion2_ids, champion1_ids)), np.concatenate((champion1_ids, champion2_ids)),
+                np.concatenate((placement_indices, placement_indices)))
+
+    def add_placement_counts(self, placement_counts: np.ndarray) -> None:
+        if len(self) == 0:
+            return None
+        champion_indices, teammate_indices, placement_indices = self.placement_count_indices()
+        if champion_indices.size * 8 < placement_counts.size:
+            # A few matches touch a few cells, a dense bincount over the whole tensor only pays off for large batches.
+            np.add.at(placement_counts, (champion_indices, teammate_indices, placement_indices), 1)
+            return None
+        flat_indices = np.ravel_multi_index((champion_indices, teammate_indices, placement_indices), placement_counts.shape)
+        placement_counts += np.bincount(flat_indices, minlength=placement_counts.size).reshape(placement_counts.shape)
+        return None
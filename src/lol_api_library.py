@@ -1,23 +1,57 @@
+from __future__ import annotations
+
+from threading import local
+
 import requests
 
+from src.rate_limit_library import RateLimiter
+from src.metrics_library import MetricsRegistry
+
+
+PLATFORM_TO_REGIONAL_ROUTE = {
+    "br1": "americas",
+    "la1": "americas",
+    "la2": "americas",
+    "na1": "americas",
+    "oc1": "sea",
+    "ph2": "sea",
+    "sg2": "sea",
+    "th2": "sea",
+    "tw2": "sea",
+    "vn2": "sea",
+    "eun1": "europe",
+    "euw1": "europe",
+    "ru": "europe",
+    "tr1": "europe",
+    "jp1": "asia",
+    "kr": "asia",
+}
+
 
-from riotwatcher import ApiError
+# Riot answers these when the API key is expired or invalid, which no retry can fix.
+INVALID_API_KEY_STATUS_CODES = (401, 403)
 
 
-def get_puuid_matches(region, puuid, watcher, start: int=0, count: int=20):
-    # 1 request.
+def response_status_code(error: requests.RequestException) -> int | None:
+    return error.response.status_code if error.response is not None else None
+
+
+def get_puuid_matches(region, puuid, watcher, start: int=0, count: int=20, queue: int = None):
+    # 1 request. riotwatcher's ApiError is a requests.HTTPError too, so both clients' errors are caught here.
     matches = []
     try:
-        matches = watcher.match.matchlist_by_puuid(region, puuid, start=start, count=count)
-    except ApiError as e:
-        print("Most likely the RIOT_DEV_KEY is expired or invalid.")
+        matches = watcher.match.matchlist_by_puuid(region, puuid, start=start, count=count, queue=queue)
+    except requests.RequestException as e:
+        if response_status_code(e) in INVALID_API_KEY_STATUS_CODES:
+            print("Most likely the RIOT_DEV_KEY is expired or invalid.")
         raise e
 
     return matches
 
 
-def get_player_puuid(game_name: str, tag_line: str, api_key: str, region: str = "europe") -> str:
-    request_url = f"https://{region}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}?api_key={api_key}"
+def get_player_puuid(game_name: str, tag_line: str, api_key: str, region: str = "europe",
+                     base_url: str = "https://{region}.api.riotgames.com") -> str:
+    request_url = f"{base_url.format(region=region)}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}?api_key={api_key}"
     response = requests.get(request_url)
     data = response.json()
     if "puuid" not in data:
@@ -27,3 +61,60 @@ def get_player_puuid(game_name: str, tag_line: str, api_key: str, region: str =
 
 def parse_match_puuids(match_detail: dict) -> list[str]:
     return match_detail["metadata"]["participants"]
+
+
+# A drop-in for the parts of LolWatcher the scraper uses, which exposes the response headers to the rate limiter.
+class RiotApiClient:
+    RIOT_API_BASE_URL = "https://{region}.api.riotgames.com"
+
+    def __init__(self, api_key: str, rate_limiter: RateLimiter = None, base_url: str = RIOT_API_BASE_URL,
+                 max_retries: int = 3, metrics: MetricsRegistry = None):
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.__api_key = api_key
+        self.__thread_local = local()
+        self.match = MatchApiV5(self)
+
+    @property
+    def session(self) -> requests.Session:
+        # Sessions are not thread-safe, so every worker thread keeps its own connection pool.
+        if not hasattr(self.__thread_local, "session"):
+            self.__thread_local.session = requests.Session()
+            self.__thread_local.session.headers["X-Riot-Token"] = self.__api_key
+        return self.__thread_local.session
+
+    def get(self, region: str, method: str, path: str, params: dict = None):
+        url = self.base_url.format(region=PLATFORM_TO_REGIONAL_ROUTE.get(region.lower(), region)) + path
+        for attempt in range(self.max_retries + 1):
+            waited_seconds = self.rate_limiter.acquire(method)
+            self.metrics.histogram("riot_api_rate_limit_wait_seconds", {"method": method}).observe(waited_seconds)
+            with self.metrics.histogram("riot_api_request_seconds", {"method": method}).time():
+                response = self.session.get(url, params=params)
+            self.metrics.counter("riot_api_requests_total", {"method": method, "status": response.status_code}).increment()
+            self.rate_limiter.update_from_headers(method, response.headers)
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                if "Retry-After" not in response.headers:
+                    self.rate_limiter.block_for(2 ** attempt)
+                print(f"Rate limited on \'{method}\'. Retrying ({attempt + 1}/{self.max_retries}).")
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+
+class MatchApiV5:
+    def __init__(self, client: RiotApiClient):
+        self.__client = client
+
+    def by_id(self, region: str, match_id: str) -> dict:
+        return self.__client.get(region, "match_v5.by_id", f"/lol/match/v5/matches/{match_id}")
+
+    def matchlist_by_puuid(self, region: str, puuid: str, start: int = 0, count: int = 20, queue: int = None) -> list[str]:
+        params = {"start": start, "count": count}
+        if queue is not None:
+            params["queue"] = queue
+        return self.__client.get(region, "match_v5.matchlist_by_puuid", f"/lol/match/v5/matches/by-puuid/{puuid}/ids",
+                                 params=params)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterator
+import gzip
+import json
+import os
+from threading import Lock, get_ident
+
+
+class MatchDetailCache:
+    FILE_EXTENSION = ".json.gz"
+
+    def __init__(self, dir_path: str, max_size_bytes: int = 2 * 1024 ** 3, compression_level: int = 6):
+        self.dir_path = dir_path
+        self.max_size_bytes = max_size_bytes
+        self.compression_level = compression_level
+        os.makedirs(dir_path, exist_ok=True)
+
+        self.__lock = Lock()
+        self.__entry_sizes = self.__scan_entries()
+        self.size_bytes = sum(self.__entry_sizes.values())
+
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"MatchDetailCache(\'{self.dir_path}\', {len(self)} matches, {self.size_bytes} bytes)"
+
+    def __len__(self) -> int:
+        return len(self.__entry_sizes)
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self.__entry_sizes
+
+    @property
+    def hit_rate(self) -> float:
+        number_of_lookups = self.hits + self.misses
+        if number_of_lookups == 0:
+            return 0.0
+        return self.hits / number_of_lookups
+
+    def file_path_for(self, match_id: str) -> str:
+        # Spread over subdirectories so no single directory holds every match.
+        return os.path.join(self.dir_path, match_id[-2:], f"{match_id}{self.FILE_EXTENSION}")
+
+    def get(self, match_id: str) -> dict | None:
+        with self.__lock:
+            if match_id not in self.__entry_sizes:
+                self.misses += 1
+                return None
+            self.__entry_sizes.move_to_end(match_id)
+            self.hits += 1
+
+        file_path = self.file_path_for(match_id)
+        try:
+            with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+                match_detail = json.load(f)
+            os.utime(file_path, None)
+        except (OSError, EOFError, ValueError):
+            self.__forget(match_id)
+            return None
+        return match_detail
+
+    def put(self, match_id: str, match_detail: dict) -> None:
+        file_path = self.file_path_for(match_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        compressed = gzip.compress(json.dumps(match_detail, separators=(',', ':')).encode('utf-8'),
+                                   compresslevel=self.compression_level)
+
+        temporary_file_path = f"{file_path}.{os.getpid()}.{get_ident()}.tmp"
+        with open(temporary_file_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(temporary_file_path, file_path)
+
+        with self.__lock:
+            self.size_bytes += len(compressed) - self.__entry_sizes.pop(match_id, 0)
+            self.__entry_sizes[match_id] = len(compressed)
+            evicted_match_ids = self.__pop_least_recently_used()
+
+        for evicted_match_id in evicted_match_ids:
+            try:
+                os.remove(self.file_path_for(evicted_match_id))
+            except FileNotFoundError:
+                pass
+        return None
+
+    def match_ids(self) -> list[str]:
+        with self.__lock:
+            return list(self.__entry_sizes)
+
+    def iter_match_details(self) -> Iterator[dict]:
+        for match_id in self.match_ids():
+            match_detail = self.get(match_id)
+            if match_detail is not None:
+                yield match_detail
+
+    def __pop_least_recently_used(self) -> list[str]:
+        evicted_match_ids = []
+        while self.size_bytes > self.max_size_bytes and len(self.__entry_sizes) > 1:
+            match_id, size_bytes = self.__entry_sizes.popitem(last=False)
+            self.size_bytes -= size_bytes
+            evicted_match_ids.append(match_id)
+        return evicted_match_ids
+
+    def __forget(self, match_id: str) -> None:
+        with self.__lock:
+            self.size_bytes -= self.__entry_sizes.pop(match_id, 0)
+        return None
+
+    def __scan_entries(self) -> OrderedDict[str, int]:
+        entries = []
+        for shard in os.scandir(self.dir_path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.FILE_EXTENSION):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(self.FILE_EXTENSION)], stat.st_size))
+        entries.sort()
+        return OrderedDict((match_id, size_bytes) for _, match_id, size_bytes in entries)
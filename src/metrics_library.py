@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+import json
+import math
+import os
+from threading import Event, Lock, Thread
+import time
+
+
+DEFAULT_LATENCY_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+
+
+def label_key(labels: dict[str, str] | None) -> tuple[tuple[str, str], ...]:
+    if not labels:
+        return ()
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def prometheus_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f"{name}=\"{value}\"" for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, labels: tuple[tuple[str, str], ...] = ()):
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+        self.__lock = Lock()
+
+    def increment(self, amount: float = 1.0) -> None:
+        with self.__lock:
+            self.value += amount
+        return None
+
+
+class Gauge:
+    def __init__(self, name: str, labels: tuple[tuple[str, str], ...] = ()):
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+        return None
+
+
+class Histogram:
+    def __init__(self, name: str, labels: tuple[tuple[str, str], ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_SECONDS):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.__lock = Lock()
+
+    def observe(self, value: float) -> None:
+        with self.__lock:
+            self.bucket_counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+        return None
+
+    def time(self) -> HistogramTimer:
+        return HistogramTimer(self)
+
+    @property
+    def mean(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.sum / self.count
+
+    def quantile(self, q: float) -> float:
+        # The upper bound of the bucket holding the q-th observation, as precise as the buckets allow.
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self.buckets + (math.inf,), self.bucket_counts):
+            cumulative_count += bucket_count
+            if cumulative_count >= rank:
+                return upper_bound
+        return math.inf
+
+
+class HistogramTimer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.__start_time = 0.0
+
+    def __enter__(self) -> HistogramTimer:
+        self.__start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.histogram.observe(time.perf_counter() - self.__start_time)
+        return None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.started_at = time.time()
+        self.__metrics: dict[tuple[str, tuple[tuple[str, str], ...]], Counter | Gauge | Histogram] = {}
+        self.__kinds: dict[str, str] = {}
+        self.__lock = Lock()
+
+    def __repr__(self) -> str:
+        return f"MetricsRegistry({len(self.__metrics)} series)"
+
+    def counter(self, name: str, labels: dict[str, str] = None) -> Counter:
+        return self.__get_or_create(name, "counter", labels, Counter)
+
+    def gauge(self, name: str, labels: dict[str, str] = None) -> Gauge:
+        return self.__get_or_create(name, "gauge", labels, Gauge)
+
+    def histogram(self, name: str, labels: dict[str, str] = None,
+                  buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_SECONDS) -> Histogram:
+        return self.__get_or_create(name, "histogram", labels, lambda metric_name, key: Histogram(metric_name, key, buckets))
+
+    def __get_or_create(self, name: str, kind: str, labels: dict[str, str] | None, create):
+        key = (name, label_key(labels))
+        metric = self.__metrics.get(key)
+        if metric is not None:
+            return metric
+        with self.__lock:
+            if self.__kinds.setdefault(name, kind) != kind:
+                raise TypeError(f"The metric: \'{name}\' is already registered as a {self.__kinds[name]}, not a {kind}.")
+            return self.__metrics.setdefault(key, create(name, key[1]))
+
+    def value(self, name: str, labels: dict[str, str] = None) -> float:
+        metric = self.__metrics.get((name, label_key(labels)))
+        if metric is None:
+            return 0.0
+        if isinstance(metric, Histogram):
+            return metric.count
+        return metric.value
+
+    def total(self, name: str) -> float:
+        return sum(metric.count if isinstance(metric, Histogram) else metric.value
+                   for (metric_name, _), metric in list(self.__metrics.items()) if metric_name == name)
+
+    def snapshot(self) -> dict:
+        series = []
+        for (name, labels), metric in sorted(list(self.__metrics.items()), key=lambda item: item[0]):
+            entry = {"name": name, "type": self.__kinds[name], "labels": dict(labels)}
+            if isinstance(metric, Histogram):
+                entry.update({"count": metric.count, "sum": metric.sum,
+                              "buckets": dict(zip([str(bound) for bound in metric.buckets] + ["+Inf"], metric.bucket_counts))})
+            else:
+                entry["value"] = metric.value
+            series.append(entry)
+        return {"timestamp": time.time(), "uptime_seconds": time.time() - self.started_at, "metrics": series}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=4)
+
+    def to_prometheus_text(self) -> str:
+        lines = []
+        described_names = set()
+        for (name, labels), metric in sorted(list(self.__metrics.items()), key=lambda item: item[0]):
+            if name not in described_names:
+                lines.append(f"# TYPE {name} {self.__kinds[name]}")
+                described_names.add(name)
+            if not isinstance(metric, Histogram):
+                lines.append(f"{name}{prometheus_labels(labels)} {metric.value}")
+                continue
+
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip([str(bound) for bound in metric.buckets] + ["+Inf"], metric.bucket_counts):
+                cumulative_count += bucket_count
+                lines.append(f"{name}_bucket{prometheus_labels(labels + (('le', upper_bound),))} {cumulative_count}")
+            lines.append(f"{name}_sum{prometheus_labels(labels)} {metric.sum}")
+            lines.append(f"{name}_count{prometheus_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, file_path: str) -> None:
+        # Written to a temporary file first so a scraper reading the snapshot never sees half of it.
+        content = self.to_prometheus_text() if file_path.endswith((".prom", ".txt")) else self.to_json()
+        temporary_file_path = f"{file_path}.tmp"
+        with open(temporary_file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temporary_file_path, file_path)
+        return None
+
+    def summary(self) -> str:
+        lines = [f"Metrics after {time.time() - self.started_at:.1f}s:"]
+        for (name, labels), metric in sorted(list(self.__metrics.items()), key=lambda item: item[0]):
+            series_name = f"{name}{prometheus_labels(labels)}"
+            if isinstance(metric, Histogram):
+                lines.append(f"  {series_name}: n={metric.count}, mean={metric.mean:.4f}, "
+                             f"p50<={metric.quantile(0.5)}, p95<={metric.quantile(0.95)}, total={metric.sum:.2f}")
+            else:
+                lines.append(f"  {series_name}: {metric.value:g}")
+        return "\n".join(lines)
+
+
+class MetricsSnapshotWriter:
+    def __init__(self, metrics: MetricsRegistry, file_path: str, interval_seconds: float = 10.0):
+        self.metrics = metrics
+        self.file_path = file_path
+        self.interval_seconds = interval_seconds
+        self.__stopped = Event()
+        self.__thread: Thread = None
+
+    def __enter__(self) -> MetricsSnapshotWriter:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+        return None
+
+    def start(self) -> None:
+        self.__stopped.clear()
+        self.__thread = Thread(target=self.__write_periodically, name="metrics-snapshot", daemon=True)
+        self.__thread.start()
+        return None
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        self.__thread.join()
+        self.metrics.write_snapshot(self.file_path)
+        return None
+
+    def __write_periodically(self) -> None:
+        while not self.__stopped.wait(self.interval_seconds):
+            self.metrics.write_snapshot(self.file_path)
+        return None
@@ -1,4 +1,6 @@
-import itertools
+from __future__ import annotations
+
+from statistics import NormalDist
 
 import pandas as pd
 import numpy as np
@@ -7,146 +9,233 @@ import numpy as np
 from src.league_library import Champion
 
 
+def estimate_prior_strength(placements: np.ndarray) -> float:
+    # Method of moments for a Dirichlet-multinomial: the spread of the observed averages beyond what sampling noise
+    # explains tells how far apart the true placement distributions are, and so how strongly to shrink.
+    placement_weights = np.arange(1, placements.shape[-1] + 1)
+    placements = placements.reshape(-1, placements.shape[-1])
+    sample_sizes = placements.sum(axis=-1)
+    placements = placements[sample_sizes > 1]
+    sample_sizes = sample_sizes[sample_sizes > 1]
+    if sample_sizes.size < 2:
+        return 1.0
+
+    prior_probabilities = placements.sum(axis=0) / sample_sizes.sum()
+    prior_mean = prior_probabilities @ placement_weights
+    prior_variance = prior_probabilities @ (placement_weights - prior_mean) ** 2
+    average_placements = placements @ placement_weights / sample_sizes
+    dispersion = np.mean(sample_sizes * (average_placements - prior_mean) ** 2) / prior_variance
+    if dispersion <= 1.0:
+        return float(sample_sizes.sum())
+    return float(np.clip((sample_sizes.mean() - dispersion) / (dispersion - 1.0), 1.0, sample_sizes.sum()))
+
+
+def dirichlet_placement_estimates(placements: np.ndarray, prior_strength: float = None,
+                                  confidence: float = 0.95) -> (np.ndarray, np.ndarray, np.ndarray):
+    # Each count vector gets a Dirichlet prior centred on the pooled placement distribution. Returns the posterior
+    # mean placement with the lower and upper bounds of its normal approximated credible interval.
+    placement_weights = np.arange(1, placements.shape[-1] + 1)
+    if prior_strength is None:
+        prior_strength = estimate_prior_strength(placements)
+
+    pooled_placements = placements.reshape(-1, placements.shape[-1]).sum(axis=0)
+    prior_probabilities = np.full(placements.shape[-1], 1 / placements.shape[-1])
+    if pooled_placements.sum() > 0:
+        prior_probabilities = pooled_placements / pooled_placements.sum()
+
+    posterior_counts = placements + prior_strength * prior_probabilities
+    posterior_totals = posterior_counts.sum(axis=-1)
+    posterior_means = posterior_counts @ placement_weights / posterior_totals
+    posterior_second_moments = posterior_counts @ placement_weights ** 2 / posterior_totals
+    posterior_deviations = np.sqrt((posterior_second_moments - posterior_means ** 2) / (posterior_totals + 1))
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return posterior_means, posterior_means - z * posterior_deviations, posterior_means + z * posterior_deviations
+
+
 class PairwiseChampionData:
     def __init__(self, pairwise_data: pd.DataFrame, team_count: int = 4):
-        self.data = pairwise_data
+        self.__data = pairwise_data
         self.team_count = team_count
+        self.champion_names = pairwise_data.index
+        self.placements = self.__placement_tensor(pairwise_data, team_count)
+        self.__champion_ids = {champion_name: i for i, champion_name in enumerate(self.champion_names)}
+        self.__placement_weights = np.arange(1, team_count + 1)
+        self.__average_placement_matrix: (np.ndarray, np.ndarray) = None
+
+    @classmethod
+    def from_tensor(cls, champion_names: list[str], placements: np.ndarray, team_count: int = 4) -> PairwiseChampionData:
+        new_pairwise_data = cls.__new__(cls)
+        new_pairwise_data.__data = None
+        new_pairwise_data.team_count = team_count
+        new_pairwise_data.champion_names = pd.Index(champion_names)
+        new_pairwise_data.placements = placements
+        new_pairwise_data.__champion_ids = {champion_name: i for i, champion_name in enumerate(champion_names)}
+        new_pairwise_data.__placement_weights = np.arange(1, team_count + 1)
+        new_pairwise_data.__average_placement_matrix = None
+        return new_pairwise_data
+
+    @property
+    def data(self) -> pd.DataFrame:
+        if self.__data is None:
+            number_of_champs = self.champion_names.size
+            placement_columns = [f"{champion_name}_{i}" for champion_name in self.champion_names
+                                 for i in range(1, self.team_count + 1)]
+            self.__data = pd.DataFrame(self.placements.reshape(number_of_champs, -1).copy(),
+                                       index=self.champion_names, columns=placement_columns)
+            self.__data.insert(0, "champion_names", 0)
+        return self.__data
+
+    @staticmethod
+    def __placement_tensor(pairwise_data: pd.DataFrame, team_count: int) -> np.ndarray:
+        champion_names = pairwise_data.index
+        number_of_champs = champion_names.size
+        placement_columns = [f"{champion_name}_{i}" for champion_name in champion_names
+                             for i in range(1, team_count + 1)]
+        placements = pairwise_data.reindex(columns=placement_columns, fill_value=0).to_numpy(dtype=np.int64)
+        return placements.reshape(number_of_champs, number_of_champs, team_count)
 
-    def __placements(self, champion: Champion) -> pd.DataFrame:
-        return self.data.loc[champion.name]
+    def __placements(self, champion: Champion) -> np.ndarray:
+        return self.placements[self.__champion_ids[champion.name]]
 
-    def __placement_pairwise(self, champion1: Champion, champion2: Champion) -> list[int]:
-        placements = self.__placements(champion2)
-        return [int(placements[f"{champion1.name}_{i}"]) for i in range(1, self.team_count + 1)]
+    def __placement_pairwise(self, champion1: Champion, champion2: Champion) -> np.ndarray:
+        return self.__placements(champion2)[self.__champion_ids[champion1.name]]
+
+    def __average_placements_with_n(self, placements: np.ndarray) -> (np.ndarray, np.ndarray):
+        sample_sizes = placements.sum(axis=-1)
+        placement_sums = placements @ self.__placement_weights
+        average_placements = np.divide(placement_sums, sample_sizes, out=np.zeros(sample_sizes.shape), where=sample_sizes != 0)
+        return average_placements, sample_sizes
 
     def total_samples(self) -> int:
-        return self.data.to_numpy().sum() // (self.team_count * 2)
+        return int(self.placements.sum()) // (self.team_count * 2)
 
     def total_placements(self, champion: Champion) -> np.array:
-        placements = self.__placements(champion)
-        placement_numbers = tuple(np.sum(placements.iloc[i+1::self.team_count].to_numpy()) for i in range(self.team_count))
-        return np.array(placement_numbers)
+        return self.__placements(champion).sum(axis=0)
 
     def average_placement(self, champion: Champion) -> float:
         average_placement, _ = self.__average_placement_with_n(champion)
         return average_placement
 
     def __average_placement_with_n(self, champion: Champion) -> (float, int):
-        placements = self.total_placements(champion)
-        placements = np.array(placements, dtype=np.float32)
-        num_placements = np.sum(placements)
-
-        if num_placements == 0:
-            return 0.0, 0
-
-        for i in range(1, self.team_count):
-            placements[i] *= i + 1
-
-        return float(sum(placements) / num_placements), num_placements
+        average_placement, num_placements = self.__average_placements_with_n(self.total_placements(champion))
+        return float(average_placement), int(num_placements)
 
     def average_placement_by_teammate(self, champion: Champion) -> pd.DataFrame:
-        placements = self.__placements(champion)
-
-        champ_names = self.data.index
-        num_champs = self.data.shape[0]
-
-        average_placements_list = [0 for _ in range(num_champs)]
-        sample_sizes = [0 for _ in range(num_champs)]
-
-        for i in range(num_champs):
-            champ_name = champ_names[i]
-
-            placement_counts = tuple(placements[f"{champ_name}_{j}"] for j in range(1, self.team_count + 1))
-
-            total_num_placements = sum(placement_counts)
-
-            if total_num_placements == 0:
-                continue
-
-            average_placement = sum(placement * j for j, placement in enumerate(placement_counts, 1)) / total_num_placements
-            average_placements_list[i] = average_placement
-            sample_sizes[i] = total_num_placements
-
+        average_placements, sample_sizes = self.__average_placements_with_n(self.__placements(champion))
         index_labels = [f"Average placement for \'{champion.name}\'", "Sample size (n)"]
 
-        return pd.DataFrame([average_placements_list, sample_sizes], columns=champ_names, index=pd.Index(index_labels))
+        return pd.DataFrame([average_placements, sample_sizes], columns=self.champion_names, index=pd.Index(index_labels))
 
     def average_pairwise_placement(self, champion1: Champion, champion2: Champion) -> float:
-        placements = self.__placement_pairwise(champion1, champion2)
-        number_of_placements = sum(placements)
-
-        if number_of_placements == 0:
-            return 0.0, 0
-
-        for i in range(1, self.team_count + 1):
-            placements[i - 1] *= i
-
-        return sum(placements) / number_of_placements
+        average_placement, _ = self.__average_pairwise_placement_with_n(champion1, champion2)
+        return average_placement
 
     def __average_pairwise_placement_with_n(self, champion1: Champion, champion2: Champion) -> (float, int):
-        placements = self.__placement_pairwise(champion1, champion2)
-        number_of_placements = sum(placements)
-
-        if number_of_placements == 0:
-            return 0.0, 0
-
-        for i in range(1, self.team_count + 1):
-            placements[i - 1] *= i
-
-        return sum(placements) / number_of_placements, number_of_placements
+        average_placement, number_of_placements = self.__average_placements_with_n(self.__placement_pairwise(champion1, champion2))
+        return float(average_placement), int(number_of_placements)
 
     def pairwise_placements(self, champion1: Champion, champion2: Champion) -> np.array:
-        return np.array(self.__placement_pairwise(champion1, champion2))
-
-    def best_teammates_for(self, champion: Champion, max_display_number_of_teammates: int = 10) -> pd.DataFrame:
-        average_placements = self.average_placement_by_teammate(champion).copy()
-        average_placements[average_placements == 0] = np.nan
-        average_placements.dropna(axis=1, inplace=True)
-        sorted_placements = average_placements.sort_values(by=average_placements.index.tolist(), axis=1, ascending=[True, False])
-        best_teammates = sorted_placements.iloc[:, :max_display_number_of_teammates]
-        return best_teammates
-
-    def best_champs(self, max_display_number_of_teammates: int = 10) -> pd.DataFrame:
-        champion_names = self.data.index
-        number_of_champs = champion_names.size
-        average_placements = [0.0 for _ in range(number_of_champs)]
-        sample_sizes = [0 for _ in range(number_of_champs)]
-        index_labels = ["Average placement", "Sample size (n)"]
-        for i, champion_name in enumerate(champion_names):
-            average_placements[i], sample_sizes[i] = self.__average_placement_with_n(Champion(champion_name))
-
-        top_champions = pd.DataFrame([average_placements, sample_sizes],
-                                     columns=champion_names,
-                                     index=index_labels)
-        sorted_champions = top_champions.sort_values(by=index_labels,
-                                                     axis=1,
-                                                     ascending=[True, False])
-        sorted_champions = sorted_champions.loc[:, (sorted_champions != 0).any(axis=0)]
-        return sorted_champions.iloc[:, :max_display_number_of_teammates]
-
-    def best_pairs(self, max_display_number_of_pairs: int = 10) -> pd.DataFrame:
-        champion_names = self.data.index
-        number_of_champs = champion_names.size
-        num_unique_champ_pairs = (number_of_champs * (number_of_champs - 1)) // 2
-        average_placements = [0.0 for _ in range(num_unique_champ_pairs)]
-        sample_sizes = [0 for _ in range(num_unique_champ_pairs)]
-        index_labels = ["Average placement", "Sample size (n)"]
-
-        unique_champ_pairs = list(itertools.combinations(champion_names, 2))
+        return self.__placement_pairwise(champion1, champion2).copy()
 
-        for i, champ_pair in enumerate(unique_champ_pairs):
-            c1 = Champion(champ_pair[0])
-            c2 = Champion(champ_pair[1])
-            average_placements[i], sample_sizes[i] = self.__average_pairwise_placement_with_n(c1, c2)
+    def best_teammates_for(self, champion: Champion, max_display_number_of_teammates: int = 10,
+                           minimum_sample_size: int = 1) -> pd.DataFrame:
+        average_placements, sample_sizes = self.__average_placements_with_n(self.__placements(champion))
+        index_labels = [f"Average placement for \'{champion.name}\'", "Sample size (n)"]
+        return self.__sorted_placements(average_placements, sample_sizes, self.champion_names, index_labels,
+                                        max_display_number_of_teammates, minimum_sample_size)
 
-        pairwise_champion_names = [f"{pair[0]} + {pair[1]}" for pair in unique_champ_pairs]
+    def best_champs(self, max_display_number_of_teammates: int = 10, minimum_sample_size: int = 1) -> pd.DataFrame:
+        average_placements, sample_sizes = self.__average_placements_with_n(self.placements.sum(axis=1))
+        index_labels = ["Average placement", "Sample size (n)"]
+        return self.__sorted_placements(average_placements, sample_sizes, self.champion_names, index_labels,
+                                        max_display_number_of_teammates, minimum_sample_size)
 
-        top_champions = pd.DataFrame([average_placements, sample_sizes],
-                                     columns=pairwise_champion_names,
-                                     index=index_labels)
-        sorted_champions = top_champions.loc[:, (top_champions != 0).any(axis=0)]  # noqa
-        sorted_champions = sorted_champions.sort_values(by=index_labels,
-                                                        axis=1,
-                                                        ascending=[True, False])
+    def best_pairs(self, max_display_number_of_pairs: int = 10, minimum_sample_size: int = 1) -> pd.DataFrame:
+        champion1_indices, champion2_indices = np.triu_indices(self.champion_names.size, k=1)
+        pair_placements = self.placements[champion2_indices, champion1_indices]
+        average_placements, sample_sizes = self.__average_placements_with_n(pair_placements)
+        index_labels = ["Average placement", "Sample size (n)"]
 
-        return sorted_champions.iloc[:, :max_display_number_of_pairs]
+        sorted_indices = self.__top_indices(average_placements, sample_sizes, max_display_number_of_pairs, minimum_sample_size)
+        pairwise_champion_names = [f"{self.champion_names[champion1_indices[i]]} + {self.champion_names[champion2_indices[i]]}"
+                                   for i in sorted_indices]
+
+        return pd.DataFrame([average_placements[sorted_indices], sample_sizes[sorted_indices]],
+                            columns=pairwise_champion_names,
+                            index=index_labels)
+
+    def average_placement_matrix(self) -> (np.ndarray, np.ndarray):
+        # The average placement of every champion with every teammate as one contraction over the placement axis,
+        # cached since the placements do not change once loaded.
+        if self.__average_placement_matrix is None:
+            self.__average_placement_matrix = self.__average_placements_with_n(self.placements)
+        return self.__average_placement_matrix
+
+    def champion_placement_matrix(self, max_display_number_of_champs: int = None,
+                                  minimum_sample_size: int = 1) -> pd.DataFrame:
+        # Rows and columns are the best champions by overall average placement, best first. Pairs with fewer than
+        # `minimum_sample_size` games together are NaN.
+        average_placements, sample_sizes = self.average_placement_matrix()
+        if max_display_number_of_champs is None:
+            champion_indices = np.arange(self.champion_names.size)
+        else:
+            champion_averages, champion_sample_sizes = self.__average_placements_with_n(self.placements.sum(axis=1))
+            champion_indices = self.__top_indices(champion_averages, champion_sample_sizes, max_display_number_of_champs)
+
+        pair_indices = np.ix_(champion_indices, champion_indices)
+        placement_matrix = np.where(sample_sizes[pair_indices] >= max(minimum_sample_size, 1),
+                                    average_placements[pair_indices], np.nan)
+        best_champion_names = self.champion_names[champion_indices]
+        return pd.DataFrame(placement_matrix, index=best_champion_names, columns=best_champion_names)
+
+    def adjusted_best_champs(self, max_display_number_of_champs: int = 10, minimum_sample_size: int = 1,
+                             prior_strength: float = None, confidence: float = 0.95) -> pd.DataFrame:
+        champion_placements = self.placements.sum(axis=1)
+        return self.__adjusted_sorted_placements(champion_placements, self.champion_names, max_display_number_of_champs,
+                                                 minimum_sample_size, prior_strength, confidence)
+
+    def adjusted_best_pairs(self, max_display_number_of_pairs: int = 10, minimum_sample_size: int = 1,
+                            prior_strength: float = None, confidence: float = 0.95) -> pd.DataFrame:
+        champion1_indices, champion2_indices = np.triu_indices(self.champion_names.size, k=1)
+        pair_placements = self.placements[champion2_indices, champion1_indices]
+        pairwise_champion_names = self.champion_names[champion1_indices] + " + " + self.champion_names[champion2_indices]
+        return self.__adjusted_sorted_placements(pair_placements, pairwise_champion_names, max_display_number_of_pairs,
+                                                 minimum_sample_size, prior_strength, confidence)
+
+    def __adjusted_sorted_placements(self, placements: np.ndarray, names: pd.Index, max_display_number: int,
+                                     minimum_sample_size: int, prior_strength: float, confidence: float) -> pd.DataFrame:
+        average_placements, sample_sizes = self.__average_placements_with_n(placements)
+        if prior_strength is None:
+            prior_strength = estimate_prior_strength(placements)
+        adjusted_placements, lower_bounds, upper_bounds = dirichlet_placement_estimates(placements, prior_strength, confidence)
+
+        sorted_indices = self.__top_indices(adjusted_placements, sample_sizes, max_display_number, minimum_sample_size)
+        index_labels = ["Adjusted average placement", f"Lower {confidence:.0%} bound", f"Upper {confidence:.0%} bound",
+                        "Average placement", "Sample size (n)"]
+        return pd.DataFrame([adjusted_placements[sorted_indices], lower_bounds[sorted_indices], upper_bounds[sorted_indices],
+                             average_placements[sorted_indices], sample_sizes[sorted_indices]],
+                            columns=names[sorted_indices],
+                            index=index_labels)
+
+    @staticmethod
+    def __top_indices(average_placements: np.ndarray, sample_sizes: np.ndarray, k: int,
+                      minimum_sample_size: int = 1) -> np.ndarray:
+        # Ordered by average placement, then larger sample size, then index. Only the candidates that can reach
+        # the top k are fully sorted: those with an average no worse than the k-th smallest.
+        candidate_indices = np.flatnonzero(sample_sizes >= max(minimum_sample_size, 1))
+        if k <= 0:
+            return candidate_indices[:0]
+        if k < candidate_indices.size:
+            candidate_averages = average_placements[candidate_indices]
+            kth_average = np.partition(candidate_averages, k - 1)[k - 1]
+            candidate_indices = candidate_indices[candidate_averages <= kth_average]
+        order = np.lexsort((-sample_sizes[candidate_indices], average_placements[candidate_indices]))
+        return candidate_indices[order[:k]]
+
+    def __sorted_placements(self, average_placements: np.ndarray, sample_sizes: np.ndarray, names: pd.Index,
+                            index_labels: list[str], max_display_number: int, minimum_sample_size: int = 1) -> pd.DataFrame:
+        sorted_indices = self.__top_indices(average_placements, sample_sizes, max_display_number, minimum_sample_size)
+        return pd.DataFrame([average_placements[sorted_indices], sample_sizes[sorted_indices]],
+                            columns=names[sorted_indices],
+                            index=index_labels)
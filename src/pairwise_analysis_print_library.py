@@ -1,22 +1,25 @@
+from __future__ import annotations
+
 from src.league_library import Champion
 from src.pairwise_analysis_library import PairwiseChampionData
+from src.incremental_stats_library import IncrementalChampionStats
 from src.print_library import colour_print_string_header, print_row
 
 
-def print_number_of_matches(pairwise_data: PairwiseChampionData) -> None:
+def print_number_of_matches(pairwise_data: PairwiseChampionData | IncrementalChampionStats) -> None:
     print(f"Total number of matches recorded: {pairwise_data.total_samples()}")
     print_row()
     return None
 
 
-def print_best_stats(pairwise_data: PairwiseChampionData, display_number: int) -> None:
+def print_best_stats(pairwise_data: PairwiseChampionData | IncrementalChampionStats, display_number: int) -> None:
     print(colour_print_string_header("Best overall stats:"))
     best_stats = pairwise_data.best_champs(display_number)
     print(best_stats.to_string())
     return None
 
 
-def print_best_champ_pairs(pairwise_data: PairwiseChampionData, display_number: int) -> None:
+def print_best_champ_pairs(pairwise_data: PairwiseChampionData | IncrementalChampionStats, display_number: int) -> None:
     print(f"\n{colour_print_string_header('Best champ pairs:')}")
     best_pairs = pairwise_data.best_pairs(display_number)
     print(best_pairs.to_string())
@@ -53,8 +56,18 @@ def print_champ_stats(champ_input: Champion, pairwise_data: PairwiseChampionData
     return None
 
 
-def print_pairwise_stats_best(pairwise_data: PairwiseChampionData, display_number: int) -> None:
+def print_pairwise_stats_best(pairwise_data: PairwiseChampionData | IncrementalChampionStats, display_number: int) -> None:
     print_best_stats(pairwise_data, display_number)
     print_best_champ_pairs(pairwise_data, display_number)
     print_row()
     return None
+
+
+def print_adjusted_pairwise_stats_best(pairwise_data: PairwiseChampionData, display_number: int,
+                                       minimum_sample_size: int = 1) -> None:
+    print(colour_print_string_header("Best overall stats (adjusted for sample size):"))
+    print(pairwise_data.adjusted_best_champs(display_number, minimum_sample_size).to_string())
+    print(f"\n{colour_print_string_header('Best champ pairs (adjusted for sample size):')}")
+    print(pairwise_data.adjusted_best_pairs(display_number, minimum_sample_size).to_string())
+    print_row()
+    return None
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Mapping
+import threading
+import time
+
+
+DEVELOPMENT_KEY_RATE_LIMITS = "20:1,100:120"
+
+
+class InvalidRateLimitHeaderError(Exception):
+    def __init__(self, header_value: str):
+        message = f"Rate limit header value: \'{header_value}\' is not of the form \'limit:seconds,limit:seconds\'"
+        super().__init__(message)
+
+
+def parse_rate_limit_header(header_value: str) -> list[tuple[int, int]]:
+    try:
+        return [(int(limit), int(seconds)) for limit, seconds in
+                (entry.split(':') for entry in header_value.split(',') if entry.strip())]
+    except ValueError as e:
+        raise InvalidRateLimitHeaderError(header_value) from e
+
+
+class RateLimitWindow:
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.__request_times: deque[float] = deque()
+
+    def __repr__(self) -> str:
+        return f"RateLimitWindow({self.limit}:{self.window_seconds})"
+
+    def __len__(self) -> int:
+        return len(self.__request_times)
+
+    def wait_time(self, now: float) -> float:
+        self.__expire(now)
+        if len(self.__request_times) < self.limit:
+            return 0.0
+        return self.__request_times[len(self.__request_times) - self.limit] + self.window_seconds - now
+
+    def record(self, now: float) -> None:
+        self.__request_times.append(now)
+        return None
+
+    def synchronise(self, server_count: int, now: float) -> None:
+        # The server also counts requests made by other processes sharing the key.
+        self.__expire(now)
+        for _ in range(server_count - len(self.__request_times)):
+            self.__request_times.append(now)
+        return None
+
+    def __expire(self, now: float) -> None:
+        while self.__request_times and self.__request_times[0] <= now - self.window_seconds:
+            self.__request_times.popleft()
+        return None
+
+
+# Riot counts requests in fixed windows opened by the first request, which a refilling token bucket can burst past.
+# Each window keeps its own request times instead, so no `window_seconds` span ever holds more than `limit` requests.
+class RateLimiter:
+    def __init__(self, app_rate_limits: str = DEVELOPMENT_KEY_RATE_LIMITS, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, safety_margin_seconds: float = 0.05):
+        self.__clock = clock
+        self.__sleep = sleep
+        self.safety_margin_seconds = safety_margin_seconds
+        self.__lock = threading.Lock()
+
+        self.__app_windows = [RateLimitWindow(limit, seconds) for limit, seconds in parse_rate_limit_header(app_rate_limits)]
+        self.__method_windows: dict[str, list[RateLimitWindow]] = {}
+        self.__blocked_until = 0.0
+
+        self.number_of_requests = 0
+        self.total_wait_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"RateLimiter(app={self.__app_windows}, methods={self.__method_windows})"
+
+    def acquire(self, method: str) -> float:
+        waited_seconds = 0.0
+        while True:
+            with self.__lock:
+                now = self.__clock()
+                wait_seconds = self.__wait_time(method, now)
+                if wait_seconds <= 0:
+                    for window in self.__windows(method):
+                        window.record(now)
+                    self.number_of_requests += 1
+                    self.total_wait_seconds += waited_seconds
+                    return waited_seconds
+
+            wait_seconds += self.safety_margin_seconds
+            self.__sleep(wait_seconds)
+            waited_seconds += wait_seconds
+
+    def __wait_time(self, method: str, now: float) -> float:
+        window_wait_time = max((window.wait_time(now) for window in self.__windows(method)), default=0.0)
+        return max(window_wait_time, self.__blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        with self.__lock:
+            self.__blocked_until = max(self.__blocked_until, self.__clock() + seconds)
+        return None
+
+    def update_from_headers(self, method: str, headers: Mapping[str, str]) -> None:
+        with self.__lock:
+            now = self.__clock()
+            if "X-App-Rate-Limit" in headers:
+                self.__app_windows = self.__updated_windows(self.__app_windows, headers["X-App-Rate-Limit"],
+                                                            headers.get("X-App-Rate-Limit-Count"), now)
+            if "X-Method-Rate-Limit" in headers:
+                self.__method_windows[method] = self.__updated_windows(self.__method_windows.get(method, []),
+                                                                       headers["X-Method-Rate-Limit"],
+                                                                       headers.get("X-Method-Rate-Limit-Count"), now)
+            if "Retry-After" in headers:
+                self.__blocked_until = max(self.__blocked_until, now + float(headers["Retry-After"]))
+        return None
+
+    def __windows(self, method: str) -> list[RateLimitWindow]:
+        return self.__app_windows + self.__method_windows.get(method, [])
+
+    @staticmethod
+    def __updated_windows(windows: list[RateLimitWindow], limits_header: str, counts_header: str | None,
+                          now: float) -> list[RateLimitWindow]:
+        windows_by_seconds = {window.window_seconds: window for window in windows}
+        server_counts = {}
+        if counts_header:
+            server_counts = {seconds: count for count, seconds in parse_rate_limit_header(counts_header)}
+
+        updated_windows = []
+        for limit, seconds in parse_rate_limit_header(limits_header):
+            window = windows_by_seconds.get(seconds)
+            if window is None:
+                window = RateLimitWindow(limit, seconds)
+            window.limit = limit
+            if seconds in server_counts:
+                window.synchronise(server_counts[seconds], now)
+            updated_windows.append(window)
+        return updated_windows
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+from src.file_writers_library import TextLines_FileReader
+
+
+class RecordedGameIndex:
+    # One game id per line, appended as matches are flushed, and held in a set for constant time membership checks.
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.__reader = TextLines_FileReader(file_path)
+        self.__game_ids: set[str] = set(self.__reader.iter_records())
+        self.__pending_game_ids: list[str] = []
+
+    def __repr__(self) -> str:
+        return f"RecordedGameIndex(\'{self.file_path}\', {len(self)} games)"
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self.__game_ids
+
+    def __len__(self) -> int:
+        return len(self.__game_ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__game_ids)
+
+    @property
+    def exists(self) -> bool:
+        return self.__reader.exists
+
+    @property
+    def number_of_pending_game_ids(self) -> int:
+        return len(self.__pending_game_ids)
+
+    def add(self, game_id: str) -> bool:
+        return self.update((game_id,)) == 1
+
+    def update(self, game_ids: Iterable[str]) -> int:
+        number_of_new_game_ids = 0
+        for game_id in game_ids:
+            if game_id in self.__game_ids:
+                continue
+            self.__game_ids.add(game_id)
+            self.__pending_game_ids.append(game_id)
+            number_of_new_game_ids += 1
+        return number_of_new_game_ids
+
+    def flush(self) -> None:
+        self.__reader.append(self.__pending_game_ids)
+        if not self.__reader.exists:
+            self.__reader.touch_no_prompt()
+        self.__pending_game_ids = []
+        return None
+
+    def clear(self) -> None:
+        self.__reader.save([])
+        self.__game_ids = set()
+        self.__pending_game_ids = []
+        return None
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from threading import Thread, Lock
+import time
+from urllib.parse import urlparse, parse_qs, unquote
+
+from src.lol_api_library import parse_match_puuids
+from src.rate_limit_library import DEVELOPMENT_KEY_RATE_LIMITS
+
+
+class RiotApiStubServer:
+    def __init__(self, match_details: list[dict], accounts: dict[tuple[str, str], str] = None,
+                 host: str = "127.0.0.1", port: int = 0, latency_seconds: float = 0.0,
+                 app_rate_limits: str = DEVELOPMENT_KEY_RATE_LIMITS):
+        self.match_details = {match_detail["metadata"]["matchId"]: match_detail for match_detail in match_details}
+        self.accounts = accounts if accounts is not None else {}
+        self.latency_seconds = latency_seconds
+        self.app_rate_limits = app_rate_limits
+        self.number_of_requests = 0
+        self.__request_count_lock = Lock()
+
+        self.match_ids_by_puuid: dict[str, list[str]] = {}
+        newest_first = sorted(match_details, key=lambda match_detail: match_detail["info"].get("gameCreation", 0), reverse=True)
+        for match_detail in newest_first:
+            for puuid in parse_match_puuids(match_detail):
+                self.match_ids_by_puuid.setdefault(puuid, []).append(match_detail["metadata"]["matchId"])
+
+        self.__server = ThreadingHTTPServer((host, port), self.__request_handler())
+        self.__server.daemon_threads = True
+        self.__thread: Thread = None
+
+    def __enter__(self) -> RiotApiStubServer:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+        return None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self.__thread = Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return None
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+        return None
+
+    def count_request(self) -> None:
+        with self.__request_count_lock:
+            self.number_of_requests += 1
+        return None
+
+    def response_for(self, path: str, query: dict[str, list[str]]) -> tuple[int, object]:
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if parts[:4] == ["lol", "match", "v5", "matches"] and len(parts) == 5:
+            match_detail = self.match_details.get(parts[4])
+            if match_detail is None:
+                return 404, {"status": {"message": "Data not found - match file not found", "status_code": 404}}
+            return 200, match_detail
+
+        if parts[:5] == ["lol", "match", "v5", "matches", "by-puuid"] and len(parts) == 7 and parts[6] == "ids":
+            start = int(query.get("start", ["0"])[0])
+            count = int(query.get("count", ["20"])[0])
+            match_ids = self.match_ids_by_puuid.get(parts[5], [])
+            if "queue" in query:
+                queue_id = int(query["queue"][0])
+                match_ids = [match_id for match_id in match_ids
+                             if self.match_details[match_id]["info"].get("queueId") == queue_id]
+            return 200, match_ids[start:start + count]
+
+        if parts[:5] == ["riot", "account", "v1", "accounts", "by-riot-id"] and len(parts) == 7:
+            puuid = self.accounts.get((parts[5], parts[6]))
+            if puuid is None:
+                return 404, {"status": {"message": "Data not found - No results found for player with riot id", "status_code": 404}}
+            return 200, {"puuid": puuid, "gameName": parts[5], "tagLine": parts[6]}
+
+        return 404, {"status": {"message": "Resource not found", "status_code": 404}}
+
+    def __request_handler(self) -> type[BaseHTTPRequestHandler]:
+        stub_server = self
+
+        class RiotApiStubRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                stub_server.count_request()
+                if stub_server.latency_seconds:
+                    time.sleep(stub_server.latency_seconds)
+
+                url = urlparse(self.path)
+                status_code, data = stub_server.response_for(url.path, parse_qs(url.query))
+                body = json.dumps(data).encode("utf-8")
+
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json;charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-App-Rate-Limit", stub_server.app_rate_limits)
+                self.end_headers()
+                self.wfile.write(body)
+                return None
+
+            def log_message(self, format: str, *args) -> None:
+                return None
+
+        return RiotApiStubRequestHandler
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from queue import Queue, Empty
+from threading import Thread, Lock
+import time
+
+
+class PipelineStageError(Exception):
+    def __init__(self, stage_name: str):
+        message = f"The pipeline stage: \'{stage_name}\' stopped after an error in one of its workers."
+        super().__init__(message)
+
+
+class StageCounters:
+    def __init__(self):
+        self.number_in = 0
+        self.number_out = 0
+        self.busy_seconds = 0.0
+        self.started_at: float = None
+        self.stopped_at: float = None
+        self.__lock = Lock()
+
+    def __repr__(self) -> str:
+        return (f"{self.number_in} in, {self.number_out} out, {self.busy_seconds:.2f}s busy, "
+                f"{self.throughput:.1f}/s")
+
+    def record(self, busy_seconds: float, has_output: bool) -> None:
+        with self.__lock:
+            self.number_in += 1
+            self.number_out += int(has_output)
+            self.busy_seconds += busy_seconds
+        return None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        stopped_at = self.stopped_at if self.stopped_at is not None else time.perf_counter()
+        return stopped_at - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        elapsed_seconds = self.elapsed_seconds
+        if elapsed_seconds == 0:
+            return 0.0
+        return self.number_in / elapsed_seconds
+
+
+class PipelineStage:
+    STOP = object()
+
+    # Items are handled by `number_of_workers` threads reading one bounded queue. When the queue is full `put` blocks,
+    # so a slow stage holds back the stages feeding it instead of letting its backlog grow without bound.
+    def __init__(self, name: str, handler: Callable[[object], object | None], number_of_workers: int = 1,
+                 max_queue_size: int = 64, idle_handler: Callable[[], None] = None, idle_interval_seconds: float = 1.0):
+        self.name = name
+        self.handler = handler
+        self.number_of_workers = number_of_workers
+        self.idle_handler = idle_handler
+        self.idle_interval_seconds = idle_interval_seconds
+        self.queue: Queue = Queue(maxsize=max_queue_size)
+        self.counters = StageCounters()
+        self.error: BaseException = None
+        self.__downstream: Callable[[object], None] = None
+        self.__workers: list[Thread] = []
+
+    def __repr__(self) -> str:
+        return f"PipelineStage(\'{self.name}\', {self.number_of_workers} workers, {self.counters})"
+
+    def connect(self, downstream: Callable[[object], None]) -> None:
+        self.__downstream = downstream
+        return None
+
+    def put(self, item) -> None:
+        self.queue.put(item)
+        return None
+
+    def start(self) -> None:
+        self.counters.started_at = time.perf_counter()
+        self.__workers = [Thread(target=self.__work, name=f"{self.name}-{i}", daemon=True)
+                          for i in range(self.number_of_workers)]
+        for worker in self.__workers:
+            worker.start()
+        return None
+
+    def stop(self) -> None:
+        for _ in self.__workers:
+            self.queue.put(self.STOP)
+        for worker in self.__workers:
+            worker.join()
+        self.counters.stopped_at = time.perf_counter()
+        return None
+
+    def __work(self) -> None:
+        while True:
+            try:
+                item = self.queue.get(timeout=self.idle_interval_seconds)
+            except Empty:
+                if self.idle_handler is not None and self.error is None:
+                    self.__run(self.idle_handler)
+                continue
+            if item is self.STOP:
+                return None
+            if self.error is not None:
+                continue  # Keep draining so upstream stages are never blocked on a stage that has failed.
+
+            start_time = time.perf_counter()
+            output = self.__run(self.handler, item)
+            self.counters.record(time.perf_counter() - start_time, output is not None)
+            if output is not None and self.__downstream is not None:
+                self.__downstream(output)
+
+    def __run(self, function: Callable, *args):
+        try:
+            return function(*args)
+        except BaseException as e:
+            self.error = e
+            return None
+
+
+class StreamingPipeline:
+    def __init__(self, stages: list[PipelineStage]):
+        self.stages = stages
+
+    def __enter__(self) -> StreamingPipeline:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+        return None
+
+    def __repr__(self) -> str:
+        return f"StreamingPipeline({' -> '.join(stage.name for stage in self.stages)})"
+
+    def start(self) -> None:
+        for stage in reversed(self.stages):
+            stage.start()
+        return None
+
+    def stop(self) -> None:
+        # Upstream stages stop first, so everything they emitted is still handled downstream.
+        for stage in self.stages:
+            stage.stop()
+        return None
+
+    def raise_if_failed(self) -> None:
+        for stage in self.stages:
+            if stage.error is not None:
+                raise PipelineStageError(stage.name) from stage.error
+        return None
+
+    def counters(self) -> dict[str, StageCounters]:
+        return {stage.name: stage.counters for stage in self.stages}
+
+    def print_counters(self) -> None:
+        for stage in self.stages:
+            print(f"Stage \'{stage.name}\' ({stage.number_of_workers} workers): {stage.counters}")
+        return None
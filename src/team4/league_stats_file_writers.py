@@ -7,14 +7,14 @@ class ChampPlacementWriterTeam4(ChampPlacementWriter):
 
     def validate_configuration(self) -> None:
         data = self.load()
-        if data.shape[1] != self.champion_names_with_placements.shape[1] + 1:
+        if data.shape[1] != len(self.placement_column_names) + 1:
             raise ValueError
-        if data.shape[1] != self.champion_names.shape[1] * 4 + 1:
+        if data.shape[1] != len(self.champion_registry) * 4 + 1:
             raise ValueError
         if (data.values < 0).any():
             raise ValueError("Negative values in array detected")
-        if data.columns.tolist()[1:] != self.champion_names_with_placements.columns.tolist():
+        if data.columns.tolist()[1:] != self.placement_column_names:
             raise ValueError
-        if data.index.tolist() != self.champion_names.columns.tolist():
+        if data.index.tolist() != self.champion_registry.names:
             raise ValueError
         return None